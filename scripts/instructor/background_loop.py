@@ -0,0 +1,34 @@
+"""
+Run coroutines on a long-lived event loop from synchronous threads
+"""
+
+import asyncio
+import threading
+from typing import Any, Coroutine
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running in a daemon thread
+
+    Lets the thread-pool based evaluator share async resources (browser
+    pools, HTTP clients) that must all live on one loop.
+    """
+
+    def __init__(self, name: str = 'background-loop'):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the loop and block until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the evaluation database
+
+Run against a scratch database only: tables are created, seeded and dropped.
+"""
+
+import sys
+import os
+import random
+import asyncio
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, inspect, insert
+from sqlalchemy.orm import sessionmaker
+
+from db_models import Base, Task, Repo, Result
+
+
+def _seed(engine, rows: int, batch: int = 5000):
+    """Insert `rows` tasks, repos and results in bulk"""
+    keys = []
+
+    with engine.begin() as conn:
+        for start in range(0, rows, batch):
+            tasks, repos, results = [], [], []
+            for i in range(start, min(start + batch, rows)):
+                email = f"student{i}@example.com"
+                task = f"task-{i % 50}-{i:06x}"
+                round_num = 1 + i % 2
+                nonce = str(uuid.uuid4())
+                repo_url = f"https://github.com/student{i}/{task}"
+                keys.append((email, task, round_num, nonce, repo_url))
+
+                tasks.append(dict(
+                    email=email, task=task, round=round_num, nonce=nonce,
+                    brief='brief', attachments=[], checks=[],
+                    evaluation_url='http://localhost:8000/api/notify',
+                    endpoint='http://localhost:3000/api/submit',
+                    statuscode=200 if i % 7 else 0, secret='secret'
+                ))
+                repos.append(dict(
+                    email=email, task=task, round=round_num, nonce=nonce,
+                    repo_url=repo_url, commit_sha='0' * 40,
+                    pages_url=f"https://student{i}.github.io/{task}/"
+                ))
+                results.append(dict(
+                    email=email, task=task, round=round_num, repo_url=repo_url,
+                    commit_sha='0' * 40, pages_url='', check='license_mit',
+                    score=1.0, reason='', logs=''
+                ))
+            conn.execute(insert(Task), tasks)
+            conn.execute(insert(Repo), repos)
+            conn.execute(insert(Result), results)
+
+    return keys
+
+
+def _time_lookups(Session, keys, samples: int):
+    """Median milliseconds for each hot-path lookup"""
+    timings = {'tasks(email, round, statuscode)': [],
+               'tasks(email, task, round, nonce)': [],
+               'repos(email, task, round, nonce)': [],
+               'results(email, task, round, repo_url)': []}
+    session = Session()
+
+    for email, task, round_num, nonce, repo_url in random.sample(keys, min(samples, len(keys))):
+        lookups = [
+            ('tasks(email, round, statuscode)', lambda: session.query(Task).filter_by(
+                email=email, round=round_num).filter(Task.statuscode == 200).first()),
+            ('tasks(email, task, round, nonce)', lambda: session.query(Task).filter_by(
+                email=email, task=task, round=round_num, nonce=nonce).first()),
+            ('repos(email, task, round, nonce)', lambda: session.query(Repo).filter_by(
+                email=email, task=task, round=round_num, nonce=nonce).first()),
+            ('results(email, task, round, repo_url)', lambda: session.query(Result).filter_by(
+                email=email, task=task, round=round_num, repo_url=repo_url).count()),
+        ]
+        for name, lookup in lookups:
+            start = time.perf_counter()
+            lookup()
+            timings[name].append((time.perf_counter() - start) * 1000)
+
+    session.close()
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def bench_lookups(database_url: str, rows: int, samples: int):
+    """Compare hot-path lookup latency with and without the composite indexes"""
+    engine = create_engine(database_url)
+    existing = set(inspect(engine).get_table_names())
+    tables = [Task.__table__, Repo.__table__, Result.__table__]
+
+    if existing & {t.name for t in tables}:
+        print("Error: benchmark needs a scratch database without tasks/repos/results tables")
+        sys.exit(1)
+
+    Session = sessionmaker(bind=engine)
+    # Only the composite indexes are under test; column-level unique
+    # constraints (tasks.nonce) stay in place for both runs
+    indexes = [index for table in tables for index in table.indexes]
+
+    try:
+        Base.metadata.create_all(engine, tables=tables)
+        for index in indexes:
+            index.drop(engine)
+
+        print(f"Seeding {rows} rows per table on {engine.dialect.name}...")
+        keys = _seed(engine, rows)
+
+        without = _time_lookups(Session, keys, samples)
+        for index in indexes:
+            index.create(engine)
+        if engine.dialect.name == 'postgresql':
+            with engine.begin() as conn:
+                conn.exec_driver_sql('ANALYZE')
+        with_indexes = _time_lookups(Session, keys, samples)
+
+        print(f"\n{'lookup':40s} {'no index':>10s} {'indexed':>10s} {'speedup':>9s}")
+        for name in without:
+            before, after = without[name], with_indexes[name]
+            print(f"{name:40s} {before:8.3f}ms {after:8.3f}ms {before / after:8.1f}x")
+    finally:
+        Base.metadata.drop_all(engine, tables=tables)
+        engine.dispose()
+
+
+async def _fire_notifies(url: str, submissions, concurrency: int):
+    """POST every submission, returning (elapsed seconds, status counts)"""
+    import aiohttp
+
+    limit = asyncio.Semaphore(concurrency)
+    statuses = {}
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as client:
+        async def notify(body):
+            async with limit:
+                async with client.post(url, json=body) as response:
+                    await response.read()
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(notify(body) for body in submissions))
+        return time.perf_counter() - start, statuses
+
+
+def bench_notify(database_url: str, requests_count: int, concurrency: int,
+                 port: int, app_dir: str):
+    """Requests per second on /api/notify against a freshly started API"""
+    import requests
+
+    engine = create_engine(database_url)
+    if set(inspect(engine).get_table_names()) & set(Base.metadata.tables):
+        print("Error: benchmark needs a scratch database without evaluation tables")
+        sys.exit(1)
+
+    server = None
+
+    try:
+        Base.metadata.create_all(engine)
+        keys = _seed(engine, requests_count)
+        # Only tasks are needed; notify inserts the repos itself
+        with engine.begin() as conn:
+            conn.execute(Repo.__table__.delete())
+            conn.execute(Result.__table__.delete())
+
+        submissions = [
+            {'email': email, 'task': task, 'round': round_num, 'nonce': nonce,
+             'repo_url': repo_url, 'commit_sha': '0' * 40,
+             'pages_url': f"https://pages.example.com/{i}/"}
+            for i, (email, task, round_num, nonce, repo_url) in enumerate(keys)
+        ]
+
+        env = dict(os.environ, DATABASE_URL=database_url, EVALUATION_API_PORT=str(port))
+        server = subprocess.Popen([sys.executable, os.path.join(app_dir, 'evaluation_api.py')],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                time.sleep(0.1)
+        else:
+            print("Error: evaluation API did not start")
+            sys.exit(1)
+
+        print(f"Sending {requests_count} notifications (concurrency {concurrency})...")
+        elapsed, statuses = asyncio.run(
+            _fire_notifies(f"{base_url}/api/notify", submissions, concurrency)
+        )
+
+        print(f"  Elapsed: {elapsed:.2f}s")
+        print(f"  Throughput: {requests_count / elapsed:.1f} req/s")
+        print(f"  Status codes: {statuses}")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the evaluation database')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    lookups = subparsers.add_parser('lookups', help='Hot-path lookup latency with and without indexes')
+    lookups.add_argument('--database-url',
+                         help='Scratch database URL (default: temporary SQLite file)')
+    lookups.add_argument('--rows', type=int, default=100000, help='Rows seeded per table')
+    lookups.add_argument('--samples', type=int, default=200, help='Lookups timed per query')
+
+    notify = subparsers.add_parser('notify', help='Load test /api/notify')
+    notify.add_argument('--database-url',
+                        help='Scratch database URL (default: temporary SQLite file)')
+    notify.add_argument('--requests', type=int, default=2000, help='Notifications to send')
+    notify.add_argument('--concurrency', type=int, default=20, help='Requests in flight')
+    notify.add_argument('--port', type=int, default=8765, help='Port for the API under test')
+    notify.add_argument('--app-dir', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='Directory containing the evaluation_api.py to test')
+
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    if args.benchmark == 'lookups':
+        bench_lookups(database_url, args.rows, args.samples)
+    elif args.benchmark == 'notify':
+        bench_notify(database_url, args.requests, args.concurrency, args.port, args.app_dir)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Browser pool: Long-lived Chromium instances shared across dynamic checks
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+
+
+class BrowserPool:
+    """
+    Keep a fixed number of browsers alive and hand out fresh contexts
+
+    Sync Playwright objects may only be used from the thread that created
+    them, so each browser lives in its own worker thread and callers submit
+    work to it. Every job gets a new isolated context (cookies, storage and
+    cache are not shared between evaluations). A browser is relaunched after
+    `pages_per_browser` jobs or as soon as it disconnects.
+
+    Construction raises RuntimeError if any browser fails to start.
+    """
+
+    def __init__(self, browsers: int = 2, pages_per_browser: int = 100, headless: bool = True):
+        self.browsers = max(1, browsers)
+        self.pages_per_browser = max(1, pages_per_browser)
+        self.headless = headless
+        self._jobs = queue.Queue()
+        started = [Future() for _ in range(self.browsers)]
+        self._threads = [
+            threading.Thread(target=self._worker, args=(ready,), name=f'browser-{i}', daemon=True)
+            for i, ready in enumerate(started)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        # A worker that cannot start would leave run() waiting forever
+        errors = [ready.exception() for ready in started]
+        failed = next((e for e in errors if e is not None), None)
+        if failed is not None:
+            self.close()
+            raise RuntimeError(f"Could not start browser: {failed}") from failed
+
+    def run(self, fn: Callable[[Any], Any]) -> Any:
+        """Call fn(context) on a pooled browser and return its result"""
+        future = Future()
+        self._jobs.put((fn, future))
+        return future.result()
+
+    def close(self):
+        """Stop all browsers once queued work has finished"""
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _worker(self, ready: Future):
+        try:
+            playwright = sync_playwright().start()
+            try:
+                browser = playwright.chromium.launch(headless=self.headless)
+            except Exception:
+                playwright.stop()
+                raise
+        except Exception as e:
+            ready.set_exception(e)
+            return
+
+        ready.set_result(None)
+        pages = 0
+
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+
+                fn, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    # Relaunch after a crash or once the page budget is spent
+                    if browser is None or not browser.is_connected() or pages >= self.pages_per_browser:
+                        if browser is not None:
+                            self._close_browser(browser)
+                        browser = playwright.chromium.launch(headless=self.headless)
+                        pages = 0
+
+                    context = browser.new_context()
+                    pages += 1
+                    try:
+                        future.set_result(fn(context))
+                    finally:
+                        context.close()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+        finally:
+            if browser is not None:
+                self._close_browser(browser)
+            playwright.stop()
+
+    @staticmethod
+    def _close_browser(browser):
+        try:
+            browser.close()
+        except Exception:
+            pass
+
+
+class _BrowserSlot:
+    """One pooled async browser and its usage counters"""
+
+    def __init__(self):
+        self.browser = None
+        self.pages = 0
+        self.active = 0
+
+
+class AsyncBrowserPool:
+    """
+    Async counterpart of BrowserPool with several contexts per browser
+
+    Up to `browsers * contexts_per_browser` evaluations run at once. New
+    contexts go to the least busy browser; a browser is relaunched once it
+    has served `pages_per_browser` pages and is idle, or when it disconnects.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, browsers: int = 2, contexts_per_browser: int = 4,
+                 pages_per_browser: int = 100, headless: bool = True):
+        self.browsers = max(1, browsers)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.pages_per_browser = max(1, pages_per_browser)
+        self.headless = headless
+        self._slots = [_BrowserSlot() for _ in range(self.browsers)]
+        self._capacity = None
+        self._lock = None
+        self._playwright = None
+
+    @asynccontextmanager
+    async def context(self):
+        """A fresh isolated browser context on a pooled browser"""
+        if self._capacity is None:
+            self._capacity = asyncio.Semaphore(self.browsers * self.contexts_per_browser)
+            self._lock = asyncio.Lock()
+
+        async with self._capacity:
+            slot = await self._acquire_slot()
+            try:
+                context = await slot.browser.new_context()
+                try:
+                    yield context
+                finally:
+                    await context.close()
+            finally:
+                slot.active -= 1
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            # The capacity semaphore guarantees at least one browser has a
+            # free context; prefer those with page budget left
+            free = [s for s in self._slots if s.active < self.contexts_per_browser]
+            fresh = [s for s in free if s.pages < self.pages_per_browser]
+            slot = min(fresh or free, key=lambda s: s.active)
+
+            crashed = slot.browser is not None and not slot.browser.is_connected()
+            exhausted = slot.pages >= self.pages_per_browser and slot.active == 0
+            if slot.browser is None or crashed or exhausted:
+                if slot.browser is not None:
+                    await self._close_browser(slot.browser)
+                slot.browser = await self._playwright.chromium.launch(headless=self.headless)
+                slot.pages = 0
+
+            slot.pages += 1
+            slot.active += 1
+            return slot
+
+    async def close(self):
+        for slot in self._slots:
+            if slot.browser is not None:
+                await self._close_browser(slot.browser)
+                slot.browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @staticmethod
+    async def _close_browser(browser):
+        try:
+            await browser.close()
+        except Exception:
+            pass
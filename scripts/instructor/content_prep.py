@@ -0,0 +1,192 @@
+"""
+Content preparation for LLM checks: Strip noise and fit a token budget
+"""
+
+import re
+from typing import List
+
+try:
+    import tiktoken
+except ImportError:  # Optional; character-based estimate otherwise
+    tiktoken = None
+
+
+# Budgets per prompt; roughly the old 3000/4000 character slices
+README_TOKEN_BUDGET = 750
+CODE_TOKEN_BUDGET = 1000
+# Content larger than this many budgets is evaluated in chunks instead
+CHUNK_THRESHOLD = 3
+MAX_CHUNKS = 4
+
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+
+_BASE64_URI = re.compile(r'data:([\w/+.-]+);base64,[A-Za-z0-9+/=\s]{64,}')
+_SCRIPT = re.compile(r'(<script\b[^>]*>)(.*?)(</script>)', re.S | re.I)
+_STYLE = re.compile(r'(<style\b[^>]*>)(.*?)(</style>)', re.S | re.I)
+_SVG_PATH = re.compile(r'(\sd=")[^"]{200,}(")')
+_BLANK_LINES = re.compile(r'\n\s*\n(\s*\n)+')
+_WORD = re.compile(r'[a-z][a-z0-9]{2,}')
+
+_README_PRIORITY = re.compile(r'overview|about|description|setup|install|getting started|usage|'
+                              r'how to|features|license|example', re.I)
+
+_STOPWORDS = {'the', 'and', 'for', 'with', 'that', 'this', 'from', 'your', 'should', 'must',
+              'will', 'are', 'has', 'have', 'page', 'into', 'each', 'when', 'use', 'using'}
+
+
+def count_tokens(text: str) -> int:
+    """Tokens for the chat models (tiktoken when installed, else an estimate)"""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    if count_tokens(text) <= budget:
+        return text
+    if tiktoken is not None:
+        return _encoding.decode(_encoding.encode(text, disallowed_special=())[:budget])
+    return text[:budget * CHARS_PER_TOKEN]
+
+
+def _is_minified(body: str) -> bool:
+    lines = [line for line in body.splitlines() if line.strip()]
+    if not lines:
+        return False
+    longest = max(len(line) for line in lines)
+    return longest > 1000 or (len(body) > 2000 and len(body) / len(lines) > 300)
+
+
+def _strip_blocks(pattern, html: str, kind: str) -> str:
+    def replace(match):
+        open_tag, body, close_tag = match.groups()
+        if _is_minified(body):
+            return f"{open_tag}/* minified {kind}, {len(body)} chars removed */{close_tag}"
+        return match.group(0)
+    return pattern.sub(replace, html)
+
+
+def strip_noise(text: str) -> str:
+    """Remove inline base64 payloads, minified script/CSS blobs and long SVG paths"""
+    text = _BASE64_URI.sub(lambda m: f"data:{m.group(1)};base64,[removed]", text)
+    text = _strip_blocks(_SCRIPT, text, 'script')
+    text = _strip_blocks(_STYLE, text, 'css')
+    text = _SVG_PATH.sub(r'\1[path removed]\2', text)
+    return _BLANK_LINES.sub('\n\n', text)
+
+
+def _markdown_sections(text: str) -> List[str]:
+    sections, current = [], []
+    for line in text.splitlines(keepends=True):
+        if line.startswith('#') and current:
+            sections.append(''.join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append(''.join(current))
+    return sections
+
+
+def _html_sections(text: str) -> List[str]:
+    """Split at top-level block boundaries, keeping each script block whole"""
+    parts = re.split(r'(?=<(?:script|style|section|header|footer|main|nav|form|table|div)\b)',
+                     text, flags=re.I)
+    sections, current = [], ''
+    for part in parts:
+        if current and len(current) + len(part) > 1200:
+            sections.append(current)
+            current = ''
+        current += part
+    if current:
+        sections.append(current)
+    return sections
+
+
+def _keywords(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def _score(section: str, index: int, keywords: set, kind: str) -> float:
+    score = 0.0
+    if index == 0:
+        score += 10  # Title / <head> frames everything else
+    if kind == 'markdown' and _README_PRIORITY.search(section.split('\n', 1)[0]):
+        score += 5
+    if kind == 'html' and re.match(r'<script\b', section, re.I):
+        score += 2  # Application logic
+    if keywords:
+        score += 5 * len(keywords & _keywords(section)) / len(keywords)
+    return score
+
+
+def fit_to_budget(text: str, budget: int, kind: str = 'markdown', context: str = '') -> str:
+    """
+    Cleaned text that fits `budget` tokens
+
+    Oversized content keeps its most relevant sections (the opening section,
+    README headings such as setup/usage, script blocks, and sections sharing
+    words with `context`, e.g. the task brief), in their original order.
+    """
+    text = strip_noise(text)
+    if count_tokens(text) <= budget:
+        return text
+
+    sections = _html_sections(text) if kind == 'html' else _markdown_sections(text)
+    keywords = _keywords(context)
+    ranked = sorted(range(len(sections)),
+                    key=lambda i: _score(sections[i], i, keywords, kind), reverse=True)
+
+    chosen, used = set(), 0
+    for i in ranked:
+        cost = count_tokens(sections[i])
+        if used + cost <= budget:
+            chosen.add(i)
+            used += cost
+
+    if not chosen:
+        return truncate_to_tokens(sections[ranked[0]], budget)
+
+    output = []
+    for i in range(len(sections)):
+        if i in chosen:
+            output.append(sections[i])
+        elif not output or output[-1] != '\n[...]\n':
+            output.append('\n[...]\n')
+    return ''.join(output)
+
+
+def split_chunks(text: str, budget: int, kind: str = 'html', max_chunks: int = MAX_CHUNKS) -> List[str]:
+    """
+    Cleaned text in consecutive chunks of at most `budget` tokens
+
+    Returns a single chunk when the content is small enough to be fitted
+    instead (under CHUNK_THRESHOLD budgets).
+    """
+    text = strip_noise(text)
+    if count_tokens(text) <= budget * CHUNK_THRESHOLD:
+        return [fit_to_budget(text, budget, kind)]
+
+    sections = _html_sections(text) if kind == 'html' else _markdown_sections(text)
+    chunks, current, used = [], [], 0
+    for section in sections:
+        cost = count_tokens(section)
+        if cost > budget:
+            section, cost = truncate_to_tokens(section, budget), budget
+        if current and used + cost > budget:
+            chunks.append(''.join(current))
+            current, used = [], 0
+        current.append(section)
+        used += cost
+    if current:
+        chunks.append(''.join(current))
+
+    if len(chunks) <= max_chunks:
+        return chunks
+    # Spread the chunks we keep across the whole file
+    step = (len(chunks) - 1) / (max_chunks - 1)
+    return [chunks[round(i * step)] for i in range(max_chunks)]
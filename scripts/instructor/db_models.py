@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Text, JSON, Float
+from sqlalchemy import create_engine, inspect, text, Column, String, Integer, DateTime, Text, JSON, Float, Index
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +15,10 @@ Base = declarative_base()
 class Task(Base):
     """Tasks sent to students"""
     __tablename__ = 'tasks'
+    __table_args__ = (
+        Index('ix_tasks_email_round_status', 'email', 'round', 'statuscode'),
+        Index('ix_tasks_submission', 'email', 'task', 'round', 'nonce'),
+    )
     
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -34,6 +41,9 @@ class Task(Base):
 class Repo(Base):
     """Repositories submitted by students"""
     __tablename__ = 'repos'
+    __table_args__ = (
+        Index('uq_repos_submission', 'email', 'task', 'round', 'nonce', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -52,6 +62,9 @@ class Repo(Base):
 class Result(Base):
     """Evaluation results"""
     __tablename__ = 'results'
+    __table_args__ = (
+        Index('ix_results_submission', 'email', 'task', 'round', 'repo_url'),
+    )
     
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -65,27 +78,278 @@ class Result(Base):
     score = Column(Float, nullable=False)
     reason = Column(Text)
     logs = Column(Text)
+    fingerprint = Column(String(64))  # Hash of the check's inputs; NULL if it errored
     
     def __repr__(self):
         return f"<Result {self.check} - {self.score} - {self.task}>"
 
 
+class Delivery(Base):
+    """Task deliveries awaiting retry"""
+    __tablename__ = 'deliveries'
+    __table_args__ = (
+        Index('ix_deliveries_due', 'status', 'next_attempt_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    email = Column(String, nullable=False)
+    task = Column(String, nullable=False)
+    round = Column(Integer, nullable=False)
+    nonce = Column(String, nullable=False, unique=True)
+    endpoint = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default='pending')  # pending, delivered, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=8)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_statuscode = Column(Integer)
+    last_error = Column(Text)
+    history = Column(JSON)  # [{'at', 'status_code', 'error'}, ...] one entry per attempt
+    
+    def __repr__(self):
+        return f"<Delivery {self.task} Round {self.round} - {self.email} ({self.status})>"
+
+
+class EvaluationJob(Base):
+    """Submissions waiting to be evaluated by eval_worker.py"""
+    __tablename__ = 'evaluation_jobs'
+    __table_args__ = (
+        Index('ix_evaluation_jobs_due', 'status', 'next_attempt_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    repo_id = Column(Integer, nullable=False, unique=True)
+    status = Column(String, nullable=False, default='pending')  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = Column(String)
+    claimed_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    last_error = Column(Text)
+    
+    def __repr__(self):
+        return f"<EvaluationJob repo {self.repo_id} ({self.status})>"
+
+
+class RepoMetadata(Base):
+    """GitHub repository metadata cached between evaluation runs"""
+    __tablename__ = 'repo_metadata'
+    
+    id = Column(Integer, primary_key=True)
+    repo = Column(String, nullable=False, unique=True)  # owner/name, lowercase
+    created_at = Column(DateTime)  # UTC
+    default_branch = Column(String)
+    pages_status = Column(String)  # enabled, disabled, or NULL if unknown
+    etag = Column(String)
+    fetched_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<RepoMetadata {self.repo} ({self.created_at})>"
+
+
+class LLMCache(Base):
+    """LLM responses keyed by a hash of model, prompt version and prompt"""
+    __tablename__ = 'llm_cache'
+    __table_args__ = (
+        Index('ix_llm_cache_created', 'created_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(64), nullable=False, unique=True)
+    check = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_version = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<LLMCache {self.check} v{self.prompt_version} {self.key[:12]}>"
+
+
 # Database connection
-def get_engine():
-    database_url = os.getenv('DATABASE_URL', 'sqlite:///llm_deployment.db')
-    return create_engine(database_url, echo=False)
+#
+# Engines and session factories are created once per DATABASE_URL and shared
+# by the whole process so connections are pooled between requests.
+_engines = {}
+_sessionmakers = {}
+_engine_lock = threading.Lock()
+
+
+def _get_database_url() -> str:
+    return os.getenv('DATABASE_URL', 'sqlite:///llm_deployment.db')
+
+
+def _engine_options(database_url: str) -> dict:
+    """Pool settings, tunable through the environment"""
+    options = {
+        'echo': False,
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    # SQLite picks its own pool class; sizing only applies to server databases
+    if not database_url.startswith('sqlite'):
+        options['pool_size'] = int(os.getenv('DB_POOL_SIZE', 5))
+        options['max_overflow'] = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    return options
+
+
+def get_engine(database_url: str = None):
+    database_url = database_url or _get_database_url()
+    with _engine_lock:
+        engine = _engines.get(database_url)
+        if engine is None:
+            engine = create_engine(database_url, **_engine_options(database_url))
+            _engines[database_url] = engine
+    return engine
+
+
+def get_sessionmaker(database_url: str = None):
+    database_url = database_url or _get_database_url()
+    with _engine_lock:
+        factory = _sessionmakers.get(database_url)
+    if factory is None:
+        engine = get_engine(database_url)
+        with _engine_lock:
+            factory = _sessionmakers.setdefault(database_url, sessionmaker(bind=engine))
+    return factory
 
 
 def get_session():
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_sessionmaker()()
+
+
+def migrate_database(engine):
+    """
+    Bring an existing database up to the current schema
+
+    create_all() only creates missing tables, so columns and indexes added to
+    tables that already exist are created here. Safe to run repeatedly.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                print(f"✗ Cannot add required column {table.name}.{column.name} to existing rows")
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+            print(f"✓ Added column {table.name}.{column.name}")
+
+    for table in Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            try:
+                index.create(engine, checkfirst=True)
+            except IntegrityError as e:
+                print(f"✗ Could not create {index.name}: existing rows violate it ({e.orig})")
+                print(f"  Remove the duplicate rows from {table.name} and run again")
+
+
+# Async connection, used by the evaluation API
+#
+# The async URL is derived from DATABASE_URL by swapping in an async driver
+# (aiosqlite / asyncpg) unless ASYNC_DATABASE_URL is set explicitly.
+_ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+}
+_async_engines = {}
+_async_sessionmakers = {}
+
+
+def get_async_database_url(database_url: str = None) -> str:
+    if not database_url and os.getenv('ASYNC_DATABASE_URL'):
+        return os.getenv('ASYNC_DATABASE_URL')
+    database_url = database_url or _get_database_url()
+    scheme, sep, rest = database_url.partition('://')
+    dialect = scheme.split('+')[0]
+    if dialect not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {dialect} databases")
+    return f"{_ASYNC_DRIVERS[dialect]}{sep}{rest}"
+
+
+def get_async_engine(database_url: str = None):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = get_async_database_url(database_url)
+    with _engine_lock:
+        engine = _async_engines.get(async_url)
+        if engine is None:
+            engine = create_async_engine(async_url, **_engine_options(async_url))
+            _async_engines[async_url] = engine
+    return engine
+
+
+def get_async_sessionmaker(database_url: str = None):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_url = get_async_database_url(database_url)
+    with _engine_lock:
+        factory = _async_sessionmakers.get(async_url)
+    if factory is None:
+        engine = get_async_engine(database_url)
+        with _engine_lock:
+            factory = _async_sessionmakers.setdefault(
+                async_url, async_sessionmaker(engine, expire_on_commit=False)
+            )
+    return factory
+
+
+def use_async_driver(database_url: str = None) -> bool:
+    """
+    Whether the API should talk to the database through an async driver
+
+    DATABASE_ASYNC=auto (the default) uses asyncpg for PostgreSQL but keeps
+    SQLite on the pooled sync driver, which is faster than aiosqlite there.
+    """
+    setting = os.getenv('DATABASE_ASYNC', 'auto').lower()
+    if setting == 'auto':
+        return not (database_url or _get_database_url()).startswith('sqlite')
+    return setting in ('1', 'true', 'yes')
+
+
+async def run_sync(session, fn, *args):
+    """
+    Call fn(sync_session, *args) from async code without blocking the event loop
+
+    Accepts either session kind handed out by get_async_db(): an AsyncSession
+    runs it through run_sync(), a plain Session in a worker thread.
+    """
+    if isinstance(session, Session):
+        return await asyncio.to_thread(fn, session, *args)
+    return await session.run_sync(fn, *args)
+
+
+async def get_async_db():
+    """FastAPI dependency: an async session scoped to one request"""
+    if use_async_driver():
+        async with get_async_sessionmaker()() as session:
+            yield session
+    else:
+        session = get_session()
+        try:
+            yield session
+        finally:
+            await asyncio.to_thread(session.close)
 
 
 def init_database():
     """Initialize database tables"""
     engine = get_engine()
     Base.metadata.create_all(engine)
+    migrate_database(engine)
     print("✓ Database initialized successfully")
 
 
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Delivery queue: Retry failed task deliveries with exponential backoff
+"""
+
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_models import get_session, Task, Delivery
+from dispatcher import run_dispatch, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, DEFAULT_TIMEOUT
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BACKOFF_BASE = float(os.getenv('DELIVERY_BACKOFF_BASE', 30))
+BACKOFF_CAP = float(os.getenv('DELIVERY_BACKOFF_CAP', 3600))
+MAX_ATTEMPTS = int(os.getenv('DELIVERY_MAX_ATTEMPTS', 8))
+# Redelivery results are committed in batches of this many
+COMMIT_BATCH_SIZE = 50
+
+
+def compute_backoff(attempts: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """
+    Delay in seconds before the next attempt, after `attempts` failures
+
+    Uses exponential backoff with "equal jitter": half the window is fixed,
+    the other half random, so retries from one outage spread out.
+    """
+    window = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return window / 2 + random.uniform(0, window / 2)
+
+
+def _attempt(status_code: int, error: str = '') -> Dict:
+    return {'at': datetime.utcnow().isoformat(), 'status_code': status_code, 'error': error}
+
+
+def enqueue_delivery(session, email: str, task: str, round_num: int, nonce: str,
+                     endpoint: str, payload: Dict, status_code: int = 0, error: str = ''):
+    """
+    Queue a delivery whose first attempt failed
+
+    The caller owns the transaction; the row is added but not committed.
+    """
+    delivery = Delivery(
+        email=email,
+        task=task,
+        round=round_num,
+        nonce=nonce,
+        endpoint=endpoint,
+        payload=payload,
+        attempts=1,
+        max_attempts=MAX_ATTEMPTS,
+        next_attempt_at=datetime.utcnow() + timedelta(seconds=compute_backoff(1)),
+        last_statuscode=status_code,
+        last_error=error,
+        history=[_attempt(status_code, error)]
+    )
+    session.add(delivery)
+    return delivery
+
+
+def drain_queue(concurrency: int = DEFAULT_CONCURRENCY, per_host: int = DEFAULT_PER_HOST,
+                timeout: float = DEFAULT_TIMEOUT, limit: int = 500) -> int:
+    """
+    Redeliver all due items once; returns the number attempted
+
+    Every attempt is appended to Delivery.history. A successful retry also
+    marks the Task row 200, so round and stats queries count it as sent.
+    """
+
+    session = get_session()
+
+    try:
+        due = session.query(Delivery).filter(
+            Delivery.status == 'pending',
+            Delivery.next_attempt_at <= datetime.utcnow()
+        ).order_by(Delivery.next_attempt_at).limit(limit).all()
+
+        if not due:
+            return 0
+
+        print(f"Redelivering {len(due)} queued tasks...")
+
+        by_id = {d.id: d for d in due}
+        deliveries = [
+            {'id': d.id, 'email': d.email, 'endpoint': d.endpoint, 'payload': d.payload}
+            for d in due
+        ]
+
+        recorded = 0
+
+        def on_result(result):
+            nonlocal recorded
+            delivery = by_id[result['id']]
+            delivery.attempts += 1
+            delivery.last_statuscode = result['status_code']
+            delivery.last_error = result['error'] or ''
+            # Reassigned, not appended, so the JSON column is marked dirty
+            delivery.history = (delivery.history or []) + [_attempt(result['status_code'], result['error'] or '')]
+
+            if result['status_code'] == 200:
+                delivery.status = 'delivered'
+                session.query(Task).filter_by(nonce=delivery.nonce).update(
+                    {Task.statuscode: 200}
+                )
+                print(f"  ✓ {delivery.email}: delivered on attempt {delivery.attempts}")
+            elif delivery.attempts >= delivery.max_attempts:
+                delivery.status = 'failed'
+                print(f"  ✗ {delivery.email}: giving up after {delivery.attempts} attempts")
+            else:
+                delay = compute_backoff(delivery.attempts)
+                delivery.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                reason = result['error'] or f"HTTP {result['status_code']}"
+                print(f"  ⟳ {delivery.email}: {reason}, retrying in {delay:.0f}s")
+
+            # on_result runs on the event loop; commit in batches
+            recorded += 1
+            if recorded % COMMIT_BATCH_SIZE == 0:
+                session.commit()
+
+        try:
+            run_dispatch(deliveries, on_result, concurrency=concurrency,
+                         per_host=per_host, timeout=timeout)
+        finally:
+            session.commit()
+        return len(due)
+    finally:
+        session.close()
+
+
+def show_queue():
+    """Print queue counts by status"""
+    session = get_session()
+
+    try:
+        for status in ('pending', 'delivered', 'failed'):
+            count = session.query(Delivery).filter_by(status=status).count()
+            print(f"  {status:10s} {count}")
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Redeliver queued task deliveries')
+    parser.add_argument('--loop', action='store_true',
+                       help='Keep draining until interrupted')
+    parser.add_argument('--interval', type=float, default=15,
+                       help='Seconds to sleep between drains in --loop mode')
+    parser.add_argument('--limit', type=int, default=500,
+                       help='Maximum deliveries attempted per drain')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                       help='Number of deliveries in flight')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                       help='Maximum deliveries in flight to one host')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                       help='Per-request deadline in seconds')
+    parser.add_argument('--status', action='store_true',
+                       help='Show queue counts and exit')
+
+    args = parser.parse_args()
+
+    if args.status:
+        show_queue()
+        sys.exit(0)
+
+    while True:
+        attempted = drain_queue(args.concurrency, args.per_host, args.timeout, args.limit)
+        if not args.loop:
+            if not attempted:
+                print("No deliveries due")
+            break
+        if attempted < args.limit:
+            time.sleep(args.interval)
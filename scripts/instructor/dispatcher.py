@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Concurrent task delivery: POST task payloads to student endpoints with asyncio
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+
+DEFAULT_CONCURRENCY = 50
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 30
+
+
+async def _deliver(client: aiohttp.ClientSession, delivery: Dict,
+                   global_limit: asyncio.Semaphore,
+                   host_limits: Dict[str, asyncio.Semaphore],
+                   timeout: float) -> Dict:
+    """POST a single delivery, respecting the global and per-host limits"""
+    host = urlparse(delivery['endpoint']).netloc.lower()
+
+    # Host slot first: deliveries queued behind a slow host must not hold
+    # global slots that requests to other hosts could use
+    async with host_limits[host], global_limit:
+        try:
+            async with client.post(
+                delivery['endpoint'],
+                json=delivery['payload'],
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                return {**delivery, 'status_code': response.status, 'error': None}
+        except asyncio.TimeoutError:
+            return {**delivery, 'status_code': 0, 'error': f'Timed out after {timeout}s'}
+        except Exception as e:
+            return {**delivery, 'status_code': 0, 'error': str(e) or e.__class__.__name__}
+
+
+async def dispatch(deliveries: Iterable[Dict],
+                   on_result: Optional[Callable[[Dict], None]] = None,
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   per_host: int = DEFAULT_PER_HOST,
+                   timeout: float = DEFAULT_TIMEOUT) -> List[Dict]:
+    """
+    Deliver payloads concurrently over one pooled HTTP client
+
+    Args:
+        deliveries: Dicts with at least 'endpoint' and 'payload'; any other
+            keys are passed through to the result
+        on_result: Called once per delivery, in completion order
+        concurrency: Maximum requests in flight overall
+        per_host: Maximum requests in flight to a single host
+        timeout: Deadline in seconds for each request
+
+    Returns:
+        List of delivery dicts with 'status_code' (0 on failure) and 'error'
+    """
+    deliveries = list(deliveries)
+    if not deliveries:
+        return []
+
+    global_limit = asyncio.Semaphore(max(1, concurrency))
+    host_limits = defaultdict(lambda: asyncio.Semaphore(max(1, per_host)))
+
+    connector = aiohttp.TCPConnector(limit=max(1, concurrency),
+                                     limit_per_host=max(1, per_host))
+    results = []
+
+    async with aiohttp.ClientSession(connector=connector) as client:
+        pending = [
+            asyncio.ensure_future(_deliver(client, d, global_limit, host_limits, timeout))
+            for d in deliveries
+        ]
+        for future in asyncio.as_completed(pending):
+            result = await future
+            if on_result:
+                on_result(result)
+            results.append(result)
+
+    return results
+
+
+def run_dispatch(deliveries: Iterable[Dict],
+                 on_result: Optional[Callable[[Dict], None]] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 per_host: int = DEFAULT_PER_HOST,
+                 timeout: float = DEFAULT_TIMEOUT) -> List[Dict]:
+    """Synchronous entry point for scripts"""
+    return asyncio.run(dispatch(deliveries, on_result, concurrency, per_host, timeout))
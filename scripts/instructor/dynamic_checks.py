@@ -4,11 +4,17 @@ Dynamic checks: Use Playwright to test deployed pages
 """
 
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-from typing import Dict, Tuple, List
+from playwright.async_api import async_playwright, TimeoutError as AsyncPlaywrightTimeout
+from typing import Dict, Tuple, List, Optional
+import asyncio
 import json
 
+from browser_pool import BrowserPool, AsyncBrowserPool
+from background_loop import BackgroundLoop
 
-def run_dynamic_checks(pages_url: str, checks: List[str], timeout: int = 30000) -> List[Dict]:
+
+def run_dynamic_checks(pages_url: str, checks: List[str], timeout: int = 30000,
+                       pool: Optional[BrowserPool] = None, batch: bool = True) -> List[Dict]:
     """
     Run JavaScript-based checks on deployed page using Playwright
     
@@ -16,61 +22,60 @@ def run_dynamic_checks(pages_url: str, checks: List[str], timeout: int = 30000)
         pages_url: URL of the deployed GitHub Pages site
         checks: List of JavaScript expressions to evaluate
         timeout: Timeout in milliseconds
+        pool: Shared browser pool; without one a browser is launched for this call
+        batch: Evaluate all checks in one browser round trip
     
     Returns:
         List of check results with score, reason, and logs
     """
-    results = []
-    
-    with sync_playwright() as p:
-        try:
+    try:
+        if pool:
+            return pool.run(lambda context: _check_page(context, pages_url, checks, timeout, batch))
+        
+        with sync_playwright() as p:
             # Launch browser
             browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
-            
-            # Set timeout
-            page.set_default_timeout(timeout)
+            try:
+                return _check_page(browser.new_context(), pages_url, checks, timeout, batch)
+            finally:
+                browser.close()
             
-            # Navigate to page
-            print(f"  → Loading {pages_url}")
-            response = page.goto(pages_url)
-            
-            if not response or response.status != 200:
-                return [{
-                    'check': 'page_load',
-                    'score': 0.0,
-                    'reason': f'Page failed to load (HTTP {response.status if response else "N/A"})',
-                    'logs': ''
-                }]
-            
-            # Wait for page to be ready
-            page.wait_for_load_state('networkidle', timeout=timeout)
-            
-            print(f"  ✓ Page loaded successfully")
-            
-            # Run each check
-            for i, check in enumerate(checks, 1):
-                print(f"  → Running check {i}/{len(checks)}")
-                result = run_single_check(page, check, i)
-                results.append(result)
-            
-            browser.close()
-            
-        except PlaywrightTimeout as e:
-            results.append({
-                'check': 'page_timeout',
-                'score': 0.0,
-                'reason': f'Page timeout: {str(e)}',
-                'logs': str(e)
-            })
-        except Exception as e:
-            results.append({
-                'check': 'browser_error',
-                'score': 0.0,
-                'reason': f'Browser error: {str(e)}',
-                'logs': str(e)
-            })
+    except PlaywrightTimeout as e:
+        return _page_timeout(e)
+    except Exception as e:
+        return _browser_error(e)
+
+
+def _check_page(context, pages_url: str, checks: List[str], timeout: int,
+                batch: bool = True) -> List[Dict]:
+    """Load the page in a fresh context and run every check"""
+    page = context.new_page()
+    
+    # Set timeout
+    page.set_default_timeout(timeout)
+    
+    # Navigate to page
+    print(f"  → Loading {pages_url}")
+    response = page.goto(pages_url)
+    
+    if not response or response.status != 200:
+        return _page_load_failed(response)
+    
+    # Wait for page to be ready
+    page.wait_for_load_state('networkidle', timeout=timeout)
+    
+    print(f"  ✓ Page loaded successfully")
+    
+    if batch:
+        print(f"  → Running {len(checks)} checks in one batch")
+        return run_checks_batch(page, checks)
+    
+    # Run each check
+    results = []
+    for i, check in enumerate(checks, 1):
+        print(f"  → Running check {i}/{len(checks)}")
+        result = run_single_check(page, check, i)
+        results.append(result)
     
     return results
 
@@ -90,32 +95,270 @@ def run_single_check(page, check_expr: str, check_num: int) -> Dict:
     try:
         # Evaluate the JavaScript expression
         result = page.evaluate(check_expr)
-        
-        # Check if result is truthy
-        if result is True or (isinstance(result, bool) and result):
-            return {
-                'check': f'check_{check_num}',
-                'score': 1.0,
-                'reason': 'Check passed',
-                'logs': f'Expression: {check_expr[:100]}'
-            }
-        else:
-            return {
-                'check': f'check_{check_num}',
-                'score': 0.0,
-                'reason': f'Check failed (returned: {result})',
-                'logs': f'Expression: {check_expr[:100]}\nResult: {result}'
-            }
-            
+        return _check_outcome(check_expr, check_num, result)
     except Exception as e:
+        return _check_error(check_expr, check_num, e)
+
+
+# Evaluates every check expression in one round trip. Each expression is
+# compiled with indirect eval so a syntax error only fails its own check;
+# functions are called and promises awaited, as page.evaluate would.
+_BATCH_SCRIPT = """async (sources) => {
+    const serialize = (value) => {
+        if (value === null || ['boolean', 'number', 'string', 'undefined'].includes(typeof value)) {
+            return value;
+        }
+        try {
+            return JSON.parse(JSON.stringify(value));
+        } catch (e) {
+            return String(value);
+        }
+    };
+    const results = [];
+    for (const source of sources) {
+        const started = performance.now();
+        try {
+            let value = (0, eval)(source);
+            if (typeof value === 'function') value = value();
+            value = await value;
+            results.push({ok: true, value: serialize(value), ms: performance.now() - started});
+        } catch (e) {
+            results.push({
+                ok: false,
+                name: e && e.name,
+                error: e && e.name ? `${e.name}: ${e.message}` : String(e),
+                ms: performance.now() - started
+            });
+        }
+    }
+    return results;
+}"""
+
+
+def _batch_outcomes(checks: List[str], outcomes: List[Dict]) -> Tuple[List[Dict], List[int]]:
+    """
+    Turn batch script output into check results
+
+    Returns the results and the indexes of checks the page refused to eval
+    (e.g. a Content-Security-Policy without 'unsafe-eval'), which must be
+    retried one at a time.
+    """
+    results, retry = [], []
+    for i, (check, outcome) in enumerate(zip(checks, outcomes)):
+        if outcome['ok']:
+            result = _check_outcome(check, i + 1, outcome['value'])
+        elif outcome.get('name') == 'EvalError':
+            retry.append(i)
+            result = None
+        else:
+            result = _check_error(check, i + 1, outcome['error'])
+        if result:
+            result['logs'] += f"\nTime: {outcome['ms']:.1f}ms"
+        results.append(result)
+    return results, retry
+
+
+def run_checks_batch(page, checks: List[str]) -> List[Dict]:
+    """Run all checks in a single page.evaluate call; same results as run_single_check"""
+    if not checks:
+        return []
+    
+    try:
+        outcomes = page.evaluate(_BATCH_SCRIPT, checks)
+    except Exception:
+        # The batch itself failed (e.g. the page navigated); fall back
+        return [run_single_check(page, check, i) for i, check in enumerate(checks, 1)]
+    
+    results, retry = _batch_outcomes(checks, outcomes)
+    for i in retry:
+        results[i] = run_single_check(page, checks[i], i + 1)
+    return results
+
+
+async def run_checks_batch_async(page, checks: List[str]) -> List[Dict]:
+    """Async version of run_checks_batch"""
+    if not checks:
+        return []
+    
+    try:
+        outcomes = await page.evaluate(_BATCH_SCRIPT, checks)
+    except Exception:
+        return [await run_single_check_async(page, check, i) for i, check in enumerate(checks, 1)]
+    
+    results, retry = _batch_outcomes(checks, outcomes)
+    for i in retry:
+        results[i] = await run_single_check_async(page, checks[i], i + 1)
+    return results
+
+
+def _check_outcome(check_expr: str, check_num: int, result) -> Dict:
+    """Score the value a check expression returned"""
+    # Check if result is truthy
+    if result is True or (isinstance(result, bool) and result):
+        return {
+            'check': f'check_{check_num}',
+            'score': 1.0,
+            'reason': 'Check passed',
+            'logs': f'Expression: {check_expr[:100]}'
+        }
+    else:
         return {
             'check': f'check_{check_num}',
             'score': 0.0,
-            'reason': f'Check error: {str(e)}',
-            'logs': f'Expression: {check_expr[:100]}\nError: {str(e)}'
+            'reason': f'Check failed (returned: {result})',
+            'logs': f'Expression: {check_expr[:100]}\nResult: {result}'
         }
 
 
+def _check_error(check_expr: str, check_num: int, error) -> Dict:
+    return {
+        'check': f'check_{check_num}',
+        'score': 0.0,
+        'reason': f'Check error: {str(error)}',
+        'logs': f'Expression: {check_expr[:100]}\nError: {str(error)}'
+    }
+
+
+def _page_timeout(error) -> List[Dict]:
+    return [{
+        'check': 'page_timeout',
+        'score': 0.0,
+        'reason': f'Page timeout: {str(error)}',
+        'logs': str(error)
+    }]
+
+
+def _browser_error(error) -> List[Dict]:
+    return [{
+        'check': 'browser_error',
+        'score': 0.0,
+        'reason': f'Browser error: {str(error)}',
+        'logs': str(error)
+    }]
+
+
+def _page_load_failed(response) -> List[Dict]:
+    return [{
+        'check': 'page_load',
+        'score': 0.0,
+        'reason': f'Page failed to load (HTTP {response.status if response else "N/A"})',
+        'logs': ''
+    }]
+
+
+async def run_dynamic_checks_async(pages_url: str, checks: List[str], timeout: int = 30000,
+                                   pool: Optional[AsyncBrowserPool] = None,
+                                   batch: bool = True) -> List[Dict]:
+    """
+    Async version of run_dynamic_checks; returns the same result dicts
+    
+    Args:
+        pages_url: URL of the deployed GitHub Pages site
+        checks: List of JavaScript expressions to evaluate
+        timeout: Timeout in milliseconds
+        pool: Shared async browser pool; without one a browser is launched for this call
+        batch: Evaluate all checks in one browser round trip
+    """
+    try:
+        if pool:
+            async with pool.context() as context:
+                return await _check_page_async(context, pages_url, checks, timeout, batch)
+        
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                return await _check_page_async(await browser.new_context(), pages_url, checks,
+                                               timeout, batch)
+            finally:
+                await browser.close()
+    
+    except AsyncPlaywrightTimeout as e:
+        return _page_timeout(e)
+    except Exception as e:
+        return _browser_error(e)
+
+
+async def _check_page_async(context, pages_url: str, checks: List[str], timeout: int,
+                            batch: bool = True) -> List[Dict]:
+    page = await context.new_page()
+    page.set_default_timeout(timeout)
+    
+    response = await page.goto(pages_url)
+    if not response or response.status != 200:
+        return _page_load_failed(response)
+    
+    await page.wait_for_load_state('networkidle', timeout=timeout)
+    
+    if batch:
+        return await run_checks_batch_async(page, checks)
+    return [await run_single_check_async(page, check, i) for i, check in enumerate(checks, 1)]
+
+
+async def run_single_check_async(page, check_expr: str, check_num: int) -> Dict:
+    """Async version of run_single_check"""
+    try:
+        result = await page.evaluate(check_expr)
+        return _check_outcome(check_expr, check_num, result)
+    except Exception as e:
+        return _check_error(check_expr, check_num, e)
+
+
+def run_dynamic_checks_many(targets: List[Tuple[str, List[str]]], timeout: int = 30000,
+                            browsers: int = 2, contexts_per_browser: int = 4,
+                            batch: bool = True) -> List[List[Dict]]:
+    """
+    Check many deployed pages at once on a shared async browser pool
+    
+    Args:
+        targets: (pages_url, checks) pairs
+        timeout: Timeout in milliseconds per page
+        browsers: Browsers in the pool
+        contexts_per_browser: Pages evaluated concurrently per browser
+    
+    Returns:
+        One list of check results per target, in input order
+    """
+    async def run_all():
+        pool = AsyncBrowserPool(browsers, contexts_per_browser)
+        try:
+            return await asyncio.gather(*(
+                run_dynamic_checks_async(pages_url, checks, timeout, pool, batch)
+                for pages_url, checks in targets
+            ))
+        finally:
+            await pool.close()
+    
+    return asyncio.run(run_all())
+
+
+class AsyncCheckRunner:
+    """
+    Sync facade over the async engine for thread-based callers
+    
+    Owns an AsyncBrowserPool on a background event loop, so many threads can
+    share browsers with several contexts each.
+    """
+    
+    def __init__(self, browsers: int = 2, contexts_per_browser: int = 4,
+                 pages_per_browser: int = 100):
+        self._loop = BackgroundLoop('dynamic-checks')
+        self.pool = AsyncBrowserPool(browsers, contexts_per_browser, pages_per_browser)
+    
+    def run_dynamic_checks(self, pages_url: str, checks: List[str], timeout: int = 30000,
+                           batch: bool = True) -> List[Dict]:
+        return self._loop.run(run_dynamic_checks_async(pages_url, checks, timeout, self.pool, batch))
+    
+    def close(self):
+        self._loop.run(self.pool.close())
+        self._loop.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
 def check_page_accessibility(page) -> Dict:
     """Run basic accessibility checks"""
     try:
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Evaluation queue: Submissions waiting for eval_worker.py
+"""
+
+import sys
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func
+
+from db_models import get_session, Repo, EvaluationJob
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_ATTEMPTS = int(os.getenv('EVAL_MAX_ATTEMPTS', 3))
+# Running jobs not finished after this many seconds are assumed lost
+# (worker killed) and handed out again
+JOB_TIMEOUT = int(os.getenv('EVAL_JOB_TIMEOUT', 1800))
+RETRY_BASE = float(os.getenv('EVAL_RETRY_BASE', 60))
+RETRY_CAP = float(os.getenv('EVAL_RETRY_CAP', 3600))
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_evaluation(session, repo: Repo) -> EvaluationJob:
+    """
+    Queue a stored submission for evaluation
+
+    The caller owns the transaction; the row is added but not committed, so
+    the submission and its job are saved together.
+    """
+    job = EvaluationJob(repo_id=repo.id, max_attempts=MAX_ATTEMPTS)
+    session.add(job)
+    return job
+
+
+def enqueue_missing(session) -> int:
+    """Queue every submission that has no job yet (e.g. stored before the queue existed)"""
+    repo_ids = [row.id for row in session.query(Repo.id)
+                .outerjoin(EvaluationJob, EvaluationJob.repo_id == Repo.id)
+                .filter(EvaluationJob.id.is_(None))]
+    for repo_id in repo_ids:
+        session.add(EvaluationJob(repo_id=repo_id, max_attempts=MAX_ATTEMPTS))
+    session.commit()
+    return len(repo_ids)
+
+
+def claim_jobs(session, worker: str, limit: int = 1) -> List[Tuple[int, str]]:
+    """
+    Mark up to `limit` due jobs as running for this worker
+
+    Returns (job id, claim token) pairs; the token must be passed back to
+    complete_job() / fail_job() so a job that was reclaimed in the meantime
+    is not finished twice.
+
+    PostgreSQL skips rows other workers have locked (FOR UPDATE SKIP LOCKED);
+    SQLite has no row locks but serialises writers, so a single UPDATE
+    claims atomically there.
+    """
+    now = datetime.utcnow()
+    token = f"{worker}/{uuid.uuid4().hex[:8]}"
+    claim = {
+        EvaluationJob.status: 'running',
+        EvaluationJob.claimed_by: token,
+        EvaluationJob.claimed_at: now,
+        EvaluationJob.attempts: EvaluationJob.attempts + 1
+    }
+
+    due = session.query(EvaluationJob.id).filter(
+        EvaluationJob.status == 'pending',
+        EvaluationJob.next_attempt_at <= now
+    ).order_by(EvaluationJob.id).limit(limit)
+
+    if session.get_bind().dialect.name == 'sqlite':
+        session.query(EvaluationJob).filter(
+            EvaluationJob.id.in_(due.scalar_subquery()),
+            EvaluationJob.status == 'pending'
+        ).update(claim, synchronize_session=False)
+        job_ids = [row.id for row in session.query(EvaluationJob.id).filter_by(claimed_by=token)]
+    else:
+        job_ids = [row.id for row in due.with_for_update(skip_locked=True)]
+        if job_ids:
+            session.query(EvaluationJob).filter(EvaluationJob.id.in_(job_ids)) \
+                .update(claim, synchronize_session=False)
+
+    session.commit()
+    return [(job_id, token) for job_id in job_ids]
+
+
+def reclaim_stale(session, timeout: int = JOB_TIMEOUT) -> int:
+    """Return running jobs whose worker went away to the queue"""
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    stale = session.query(EvaluationJob).filter(
+        EvaluationJob.status == 'running',
+        EvaluationJob.claimed_at < cutoff
+    ).with_for_update(skip_locked=True).all()
+
+    for job in stale:
+        job.status = 'pending' if job.attempts < job.max_attempts else 'failed'
+        job.last_error = f"Worker {job.claimed_by} did not finish within {timeout}s"
+        job.claimed_by = None
+    session.commit()
+    return len(stale)
+
+
+def _claimed(session, job_id: int, token: str):
+    """The job while this claim still holds it, locked until commit"""
+    return session.query(EvaluationJob).filter_by(
+        id=job_id, claimed_by=token, status='running'
+    ).with_for_update().first()
+
+
+def complete_job(session, job_id: int, token: str) -> bool:
+    """
+    Mark a claimed job done; returns False if the claim was lost
+
+    A job that ran past JOB_TIMEOUT may have been reclaimed and handed to
+    another worker, in which case this worker's results must be dropped.
+    """
+    updated = session.query(EvaluationJob).filter_by(
+        id=job_id, claimed_by=token, status='running'
+    ).update(
+        {EvaluationJob.status: 'done', EvaluationJob.finished_at: datetime.utcnow(),
+         EvaluationJob.last_error: None},
+        synchronize_session=False
+    )
+    return updated == 1
+
+
+def fail_job(session, job_id: int, token: str, error: str, retry: bool = True) -> Optional[bool]:
+    """Record a failed attempt; returns whether the job will be retried, None if the claim was lost"""
+    # Imported here so the API can enqueue without loading the dispatcher
+    from delivery_queue import compute_backoff
+
+    job = _claimed(session, job_id, token)
+    if job is None:
+        return None
+
+    job.last_error = error
+    job.claimed_by = None
+    if retry and job.attempts < job.max_attempts:
+        delay = compute_backoff(job.attempts, RETRY_BASE, RETRY_CAP)
+        job.status = 'pending'
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        return True
+
+    job.status = 'failed'
+    job.finished_at = datetime.utcnow()
+    return False
+
+
+def queue_counts(session) -> Dict[str, int]:
+    rows = session.query(EvaluationJob.status, func.count(EvaluationJob.id)) \
+        .group_by(EvaluationJob.status).all()
+    return dict(rows)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect or fill the evaluation queue')
+    parser.add_argument('--enqueue-missing', action='store_true',
+                       help='Queue submissions that have no evaluation job')
+    parser.add_argument('--retry-failed', action='store_true',
+                       help='Put failed jobs back in the queue')
+
+    args = parser.parse_args()
+
+    session = get_session()
+
+    if args.enqueue_missing:
+        print(f"✓ Queued {enqueue_missing(session)} submissions")
+
+    if args.retry_failed:
+        retried = session.query(EvaluationJob).filter_by(status='failed').update(
+            {EvaluationJob.status: 'pending', EvaluationJob.attempts: 0,
+             EvaluationJob.next_attempt_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        session.commit()
+        print(f"✓ Re-queued {retried} failed jobs")
+
+    print("\n=== Evaluation Queue ===")
+    counts = queue_counts(session)
+    for status in ('pending', 'running', 'done', 'failed'):
+        print(f"  {status:10s} {counts.get(status, 0)}")
+    session.close()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Evaluation worker: Evaluate queued submissions as they arrive
+"""
+
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from db_models import get_session, Repo, EvaluationJob
+from eval_queue import claim_jobs, reclaim_stale, complete_job, fail_job, worker_name
+from evaluate import (
+    build_job,
+    stage_pools,
+    report_results,
+    add_results,
+    DEFAULT_STATIC_WORKERS,
+    DEFAULT_LLM_WORKERS,
+    DEFAULT_BROWSER_WORKERS,
+    DEFAULT_PAGES_PER_BROWSER,
+    DEFAULT_CONTEXTS_PER_BROWSER,
+    DEFAULT_LLM_MODE
+)
+
+
+DEFAULT_WORKERS = 4
+DEFAULT_POLL_INTERVAL = 5
+RECLAIM_INTERVAL = 60
+
+
+def _load_job(session, job_id: int, token: str, llm_mode: str) -> Optional[Dict]:
+    """Evaluation job for a claimed queue entry; None if there is nothing to run"""
+    queued = session.get(EvaluationJob, job_id)
+    repo = session.get(Repo, queued.repo_id)
+    job = build_job(session, repo, llm_mode) if repo else None
+
+    if job is None:
+        fail_job(session, job_id, token, 'Submission or task not found', retry=False)
+        session.commit()
+        return None
+
+    if not job['rerun']:
+        complete_job(session, job_id, token)
+        session.commit()
+        print(f"⊘ {job['email']} - {job['task']} (Round {job['round']}): already up to date")
+        return None
+
+    return job
+
+
+def _finish(session, job_id: int, token: str, job: Dict, future):
+    """Store a finished evaluation and mark its job done in one transaction"""
+    print(f"{job['email']} - {job['task']} (Round {job['round']})")
+    print(f"  Repo: {job['repo_url']}")
+
+    try:
+        results = future.result()
+    except Exception as e:
+        retrying = fail_job(session, job_id, token, str(e))
+        session.commit()
+        if retrying is None:
+            print(f"  ⊘ Evaluation failed after the job was reclaimed: {e}\n")
+        else:
+            print(f"  ✗ Evaluation failed: {e}{' (will retry)' if retrying else ''}\n")
+        return
+
+    # Mark the job first: its row stays locked until commit, and if another
+    # worker took it over in the meantime its results win, not these
+    if not complete_job(session, job_id, token):
+        session.rollback()
+        print("  ⊘ Job was reclaimed by another worker; results dropped\n")
+        return
+
+    add_results(session, job, results)
+    session.commit()
+
+    report_results(job, results)
+
+
+def run_worker(workers: int = DEFAULT_WORKERS,
+               poll_interval: float = DEFAULT_POLL_INTERVAL,
+               once: bool = False,
+               llm_mode: str = DEFAULT_LLM_MODE,
+               **pool_options) -> int:
+    """
+    Claim and evaluate queued submissions; returns the number evaluated
+
+    Runs until interrupted, or with `once` until the queue is empty. Browsers
+    and stage pools stay up between jobs, and new jobs are claimed as soon as
+    a slot frees up. pool_options are passed to evaluate.stage_pools().
+    """
+    name = worker_name()
+    session = get_session()
+    in_flight = {}
+    evaluated = 0
+    last_reclaim = 0.0
+
+    print(f"Worker {name} evaluating up to {workers} submissions at a time...\n")
+
+    with stage_pools(llm_mode=llm_mode, **pool_options) as run_repo, \
+         ThreadPoolExecutor(workers) as repo_pool:
+        try:
+            while True:
+                if time.monotonic() - last_reclaim > RECLAIM_INTERVAL:
+                    reclaimed = reclaim_stale(session)
+                    if reclaimed:
+                        print(f"⊘ Re-queued {reclaimed} jobs abandoned by other workers")
+                    last_reclaim = time.monotonic()
+
+                free = workers - len(in_flight)
+                if free > 0:
+                    for job_id, token in claim_jobs(session, name, free):
+                        job = _load_job(session, job_id, token, llm_mode)
+                        if job is not None:
+                            in_flight[repo_pool.submit(run_repo, job)] = (job_id, token, job)
+
+                if not in_flight:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _finish(session, *in_flight.pop(future), future)
+                    evaluated += 1
+
+        except KeyboardInterrupt:
+            print(f"\n⊘ Stopping; waiting for {len(in_flight)} running evaluations")
+            for future in list(in_flight):
+                _finish(session, *in_flight.pop(future), future)
+                evaluated += 1
+        finally:
+            session.close()
+
+    return evaluated
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Evaluate queued submissions continuously')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                       help='Repositories evaluated in parallel')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                       help='Seconds between queue polls when idle')
+    parser.add_argument('--once', action='store_true',
+                       help='Exit when the queue is empty')
+    parser.add_argument('--static-workers', type=int, default=DEFAULT_STATIC_WORKERS,
+                       help='Concurrent static (GitHub) checks')
+    parser.add_argument('--llm-workers', type=int, default=DEFAULT_LLM_WORKERS,
+                       help='Concurrent LLM checks')
+    parser.add_argument('--browser-workers', type=int, default=DEFAULT_BROWSER_WORKERS,
+                       help='Browsers used for dynamic (Playwright) checks')
+    parser.add_argument('--browser-engine', choices=['sync', 'async'], default='sync',
+                       help='Playwright engine; async runs several pages per browser')
+    parser.add_argument('--contexts-per-browser', type=int, default=DEFAULT_CONTEXTS_PER_BROWSER,
+                       help='Pages checked concurrently per browser (async engine)')
+    parser.add_argument('--pages-per-browser', type=int, default=DEFAULT_PAGES_PER_BROWSER,
+                       help='Pages a browser serves before it is relaunched')
+    parser.add_argument('--llm-mode', choices=['separate', 'combined', 'batch'], default=DEFAULT_LLM_MODE,
+                       help='Score README, code and requirements in separate calls, one call, '
+                            'or skip them for llm_batch.py')
+
+    args = parser.parse_args()
+
+    evaluated = run_worker(args.workers, args.poll_interval, args.once, args.llm_mode,
+                           static_workers=args.static_workers,
+                           llm_workers=args.llm_workers,
+                           browser_workers=args.browser_workers,
+                           pages_per_browser=args.pages_per_browser,
+                           browser_engine=args.browser_engine,
+                           contexts_per_browser=args.contexts_per_browser)
+    print(f"✓ Evaluated {evaluated} submissions")
@@ -5,200 +5,477 @@ Main evaluation script: Run all checks on submitted repos
 
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import insert
+
 from db_models import get_session, Task, Repo, Result
 from static_checks import (
-    check_license, 
-    check_readme_exists, 
+    check_license,
+    check_readme_exists,
     check_repo_created_after_task,
     check_no_secrets_in_history,
     get_file_content
 )
-from dynamic_checks import run_dynamic_checks, check_page_accessibility, check_page_performance
-from llm_checks import evaluate_readme_quality, evaluate_code_quality, check_code_completeness
+from dynamic_checks import (
+    run_dynamic_checks,
+    check_page_accessibility,
+    check_page_performance,
+    AsyncCheckRunner
+)
+from browser_pool import BrowserPool
+from repo_snapshot import open_snapshot
+from repo_metadata import get_repo_metadata, prefetch_metadata
+from llm_checks import (
+    evaluate_readme_quality,
+    evaluate_code_quality,
+    check_code_completeness,
+    evaluate_combined,
+    COMBINED_CHECKS
+)
+from llm_cache import cache_stats
+from fingerprints import (
+    STATIC_CHECKS,
+    LLM_CHECKS,
+    check_fingerprints,
+    result_fingerprint,
+    stale_checks
+)
 
 
-def evaluate_all_repos():
-    """Evaluate all submitted repositories"""
-    
-    session = get_session()
-    
-    # Get all repos that haven't been fully evaluated
-    repos = session.query(Repo).all()
-    
-    print(f"Evaluating {len(repos)} repositories...\n")
-    
-    for i, repo in enumerate(repos, 1):
-        print(f"[{i}/{len(repos)}] Evaluating {repo.email} - {repo.task} (Round {repo.round})")
-        print(f"  Repo: {repo.repo_url}")
-        print(f"  Pages: {repo.pages_url}")
-        
-        # Check if already evaluated
-        existing_results = session.query(Result).filter_by(
-            email=repo.email,
-            task=repo.task,
-            round=repo.round,
-            repo_url=repo.repo_url
-        ).count()
-        
-        if existing_results > 5:  # If we have multiple results, skip
-            print(f"  ⊘ Already evaluated\n")
-            continue
-        
-        # Get the original task
+# Default concurrency per stage: static checks are network-bound, LLM calls
+# are paced by the shared client's rate limits and browsers are memory-bound
+DEFAULT_STATIC_WORKERS = 8
+DEFAULT_LLM_WORKERS = 16
+DEFAULT_BROWSER_WORKERS = 2
+DEFAULT_PAGES_PER_BROWSER = 100
+DEFAULT_CONTEXTS_PER_BROWSER = 4
+DEFAULT_BATCH_SIZE = 20
+# separate: one LLM call per rubric item; combined: one call per repo;
+# batch: skipped here and run offline with llm_batch.py
+DEFAULT_LLM_MODE = os.getenv('LLM_MODE', 'separate')
+
+
+def _check_result(check: str, score: float, reason: str, logs: str) -> Dict:
+    return {
+        'check': check,
+        'score': score,
+        'reason': reason,
+        'logs': logs
+    }
+
+
+def _wanted(job: Dict, check: str) -> bool:
+    """Whether this run re-evaluates `check` (jobs without 'rerun' run everything)"""
+    return job.get('rerun') is None or check in job['rerun']
+
+
+def run_static_stage(job: Dict) -> Tuple[List[Dict], str, str]:
+    """
+    Static checks for one repo
+
+    Returns the results plus README and index.html content for the LLM stage
+    """
+    results = []
+
+    if not any(_wanted(job, check) for check in STATIC_CHECKS + LLM_CHECKS):
+        return results, '', ''
+
+    # One archive download serves every file read below; without it each
+    # check falls back to its own request
+    with open_snapshot(job['repo_url'], job['commit_sha']) as snapshot:
+        # Check LICENSE
+        if _wanted(job, 'license_mit'):
+            score, reason, logs = check_license(job['repo_url'], job['commit_sha'], snapshot)
+            results.append(_check_result('license_mit', score, reason, logs))
+
+        # Check README exists (its content is needed by the LLM stage either way)
+        score, reason, readme_content = check_readme_exists(job['repo_url'], job['commit_sha'], snapshot)
+        if _wanted(job, 'readme_exists'):
+            results.append(_check_result('readme_exists', score, reason, readme_content[:500]))
+
+        # Check repo creation time (metadata is cached in the database)
+        if _wanted(job, 'repo_timing'):
+            metadata = get_repo_metadata(job['repo_url'])
+            score, reason, logs = check_repo_created_after_task(job['repo_url'], job['task_timestamp'], metadata)
+            results.append(_check_result('repo_timing', score, reason, logs))
+
+        # Check for secrets
+        if _wanted(job, 'no_secrets'):
+            score, reason, logs = check_no_secrets_in_history(job['repo_url'], job['commit_sha'], snapshot)
+            results.append(_check_result('no_secrets', score, reason, logs))
+
+        code_content = get_file_content(job['repo_url'], job['commit_sha'], 'index.html', snapshot)
+
+    return results, readme_content, code_content
+
+
+def run_llm_stage(job: Dict, readme_content: str, code_content: str,
+                  mode: str = 'separate') -> List[Dict]:
+    """LLM-based checks for one repo"""
+    results = []
+
+    # Batch mode leaves LLM checks to llm_batch.py
+    if mode == 'batch':
+        return results
+
+    if mode == 'combined':
+        # One paid call covers all three; skip it when none is being re-run
+        if not any(_wanted(job, check) for check in COMBINED_CHECKS):
+            return results
+        scores = evaluate_combined(readme_content, code_content, job['brief'], 'html')
+        for check in COMBINED_CHECKS:
+            if check in scores and _wanted(job, check):
+                results.append(_check_result(check, *scores[check]))
+        return results
+
+    # README quality
+    if readme_content and _wanted(job, 'readme_quality'):
+        score, reason, logs = evaluate_readme_quality(readme_content)
+        results.append(_check_result('readme_quality', score, reason, logs))
+
+    # Code quality
+    if code_content and _wanted(job, 'code_quality'):
+        score, reason, logs = evaluate_code_quality(code_content, 'html')
+        results.append(_check_result('code_quality', score, reason, logs))
+
+    # Requirements completeness
+    if code_content and _wanted(job, 'requirements_met'):
+        score, reason, logs = check_code_completeness(code_content, job['brief'])
+        results.append(_check_result('requirements_met', score, reason, logs))
+
+    return results
+
+
+def run_browser_stage(job: Dict, run_checks=run_dynamic_checks) -> List[Dict]:
+    """Dynamic (Playwright) checks for one repo"""
+    # Every other check runs on the deployed page; all of them are re-run
+    # together since the page load dominates
+    rerun = job.get('rerun')
+    if rerun is not None and not rerun - set(STATIC_CHECKS + LLM_CHECKS):
+        return []
+
+    try:
+        return run_checks(job['pages_url'], job['checks'])
+    except Exception as e:
+        return [_check_result('dynamic_error', 0.0, f'Dynamic checks failed: {str(e)}', str(e))]
+
+
+def evaluate_repo(job: Dict, static_pool, llm_pool, browser_pool,
+                  run_checks=run_dynamic_checks, llm_mode: str = 'separate') -> List[Dict]:
+    """
+    Run every stage for one repo on the shared stage pools
+
+    Browser checks start alongside static checks; LLM checks wait for the
+    file content fetched by the static stage.
+    """
+    static_future = static_pool.submit(run_static_stage, job)
+    browser_future = browser_pool.submit(run_browser_stage, job, run_checks)
+
+    static_results, readme_content, code_content = static_future.result()
+    llm_results = llm_pool.submit(run_llm_stage, job, readme_content, code_content, llm_mode).result()
+
+    return static_results + llm_results + browser_future.result()
+
+
+def _make_job(repo: Repo, task: Task) -> Dict:
+    """Plain copy of the fields the stages need, safe to hand to worker threads"""
+    return {
+        'email': repo.email,
+        'task': repo.task,
+        'round': repo.round,
+        'repo_url': repo.repo_url,
+        'commit_sha': repo.commit_sha,
+        'pages_url': repo.pages_url,
+        'brief': task.brief,
+        'checks': task.checks or [],
+        'task_timestamp': task.timestamp
+    }
+
+
+def build_job(session, repo: Repo, llm_mode: str = DEFAULT_LLM_MODE,
+              tasks: Dict[Tuple, Task] = None, stored: Dict[str, str] = None) -> Optional[Dict]:
+    """
+    Job for one submission, or None if its task is missing
+
+    job['rerun'] holds the checks whose inputs or code changed, or that
+    errored; it is empty when every stored result is current. The task and
+    stored fingerprints are looked up unless the caller preloaded them.
+    """
+    if tasks is not None:
+        task = tasks.get((repo.email, repo.task, repo.round))
+    else:
         task = session.query(Task).filter_by(
             email=repo.email,
             task=repo.task,
             round=repo.round
         ).first()
-        
-        if not task:
-            print(f"  ✗ Task not found\n")
-            continue
-        
-        # Run all checks
-        results = []
-        
-        # 1. Static Checks
-        print("  → Running static checks...")
-        
-        # Check LICENSE
-        score, reason, logs = check_license(repo.repo_url, repo.commit_sha)
-        results.append({
-            'check': 'license_mit',
-            'score': score,
-            'reason': reason,
-            'logs': logs
-        })
-        print(f"    LICENSE: {score} - {reason}")
-        
-        # Check README exists
-        score, reason, readme_content = check_readme_exists(repo.repo_url, repo.commit_sha)
-        results.append({
-            'check': 'readme_exists',
-            'score': score,
-            'reason': reason,
-            'logs': readme_content[:500]
-        })
-        print(f"    README exists: {score} - {reason}")
-        
-        # Check repo creation time
-        score, reason, logs = check_repo_created_after_task(repo.repo_url, task.timestamp)
-        results.append({
-            'check': 'repo_timing',
-            'score': score,
-            'reason': reason,
-            'logs': logs
-        })
-        print(f"    Repo timing: {score} - {reason}")
-        
-        # Check for secrets
-        score, reason, logs = check_no_secrets_in_history(repo.repo_url)
-        results.append({
-            'check': 'no_secrets',
-            'score': score,
-            'reason': reason,
-            'logs': logs
-        })
-        print(f"    No secrets: {score} - {reason}")
-        
-        # 2. LLM-based Static Checks
-        print("  → Running LLM checks...")
-        
-        # README quality
-        if readme_content:
-            score, reason, logs = evaluate_readme_quality(readme_content)
-            results.append({
-                'check': 'readme_quality',
-                'score': score,
-                'reason': reason,
-                'logs': logs
-            })
-            print(f"    README quality: {score} - {reason}")
-        
-        # Code quality
-        code_content = get_file_content(repo.repo_url, repo.commit_sha, 'index.html')
-        if code_content:
-            score, reason, logs = evaluate_code_quality(code_content, 'html')
-            results.append({
-                'check': 'code_quality',
-                'score': score,
-                'reason': reason,
-                'logs': logs
-            })
-            print(f"    Code quality: {score} - {reason}")
-            
-            # Requirements completeness
-            score, reason, logs = check_code_completeness(code_content, task.brief)
-            results.append({
-                'check': 'requirements_met',
-                'score': score,
-                'reason': reason,
-                'logs': logs
-            })
-            print(f"    Requirements: {score} - {reason}")
-        
-        # 3. Dynamic Checks (Playwright)
-        print("  → Running dynamic checks...")
-        
-        try:
-            dynamic_results = run_dynamic_checks(repo.pages_url, task.checks)
-            results.extend(dynamic_results)
-            
-            for dr in dynamic_results:
-                print(f"    {dr['check']}: {dr['score']} - {dr['reason']}")
-        except Exception as e:
-            print(f"    ✗ Dynamic checks failed: {e}")
-            results.append({
-                'check': 'dynamic_error',
-                'score': 0.0,
-                'reason': f'Dynamic checks failed: {str(e)}',
-                'logs': str(e)
-            })
-        
-        # 4. Save results to database
-        print("  → Saving results...")
-        
-        for result in results:
-            db_result = Result(
-                email=repo.email,
-                task=repo.task,
-                round=repo.round,
-                repo_url=repo.repo_url,
-                commit_sha=repo.commit_sha,
-                pages_url=repo.pages_url,
-                check=result['check'],
-                score=result['score'],
-                reason=result.get('reason', ''),
-                logs=result.get('logs', '')
-            )
-            session.add(db_result)
-        
-        session.commit()
-        
-        # Calculate overall score
-        total_score = sum(r['score'] for r in results) / len(results) if results else 0
-        print(f"  ✓ Overall Score: {total_score:.2f}\n")
-    
+
+    if not task:
+        print(f"  ✗ Task not found for {repo.email} - {repo.task} (Round {repo.round})")
+        return None
+
+    if stored is None:
+        stored = _load_fingerprints(session, repo).get(_submission_key(repo), {})
+
+    job = _make_job(repo, task)
+    job['fingerprints'] = check_fingerprints(job, llm_mode)
+    job['rerun'] = stale_checks(job['fingerprints'], stored, llm_mode)
+    job['stored'] = set(stored)
+    return job
+
+
+def _submission_key(row) -> Tuple:
+    """(email, task, round, repo_url) of a Repo, Result or job dict"""
+    if isinstance(row, dict):
+        return (row['email'], row['task'], row['round'], row['repo_url'])
+    return (row.email, row.task, row.round, row.repo_url)
+
+
+def _load_tasks(session) -> Dict[Tuple, Task]:
+    """Every task by (email, task, round), in one query"""
+    tasks = {}
+    for task in session.query(Task).order_by(Task.id):
+        tasks.setdefault((task.email, task.task, task.round), task)
+    return tasks
+
+
+def _load_fingerprints(session, repo: Repo = None) -> Dict[Tuple, Dict[str, str]]:
+    """
+    {submission key: {check: fingerprint}} of stored results
+
+    One query for every submission, or for just `repo` when given.
+    """
+    query = session.query(Result.email, Result.task, Result.round, Result.repo_url,
+                          Result.check, Result.fingerprint)
+    if repo is not None:
+        query = query.filter_by(email=repo.email, task=repo.task,
+                                round=repo.round, repo_url=repo.repo_url)
+
+    stored = {}
+    for row in query:
+        checks = stored.setdefault(_submission_key(row), {})
+        # Duplicate rows that disagree are treated as unknown
+        checks[row.check] = row.fingerprint if checks.get(row.check, row.fingerprint) == row.fingerprint else None
+    return stored
+
+
+def _result_row(job: Dict, result: Dict) -> Dict:
+    return {
+        'email': job['email'],
+        'task': job['task'],
+        'round': job['round'],
+        'repo_url': job['repo_url'],
+        'commit_sha': job['commit_sha'],
+        'pages_url': job['pages_url'],
+        'check': result['check'],
+        'score': result['score'],
+        'reason': result.get('reason', ''),
+        'logs': result.get('logs', ''),
+        'fingerprint': result_fingerprint(job.get('fingerprints', {}), result)
+    }
+
+
+def _save_results(session, evaluated: List[Tuple[Dict, List[Dict]]]):
+    """
+    Replace the re-run checks' stored results with new ones
+
+    Old rows are deleted only for checks known to be stored; the new rows
+    of every repo go in one executemany INSERT. The caller commits.
+    """
+    rows = []
+    for job, results in evaluated:
+        replaced = set(job.get('rerun') or ()) | {result['check'] for result in results}
+        if 'stored' in job:
+            replaced &= job['stored']
+        if replaced:
+            session.query(Result).filter(
+                Result.email == job['email'],
+                Result.task == job['task'],
+                Result.round == job['round'],
+                Result.repo_url == job['repo_url'],
+                Result.check.in_(replaced)
+            ).delete(synchronize_session=False)
+
+        rows.extend(_result_row(job, result) for result in results)
+
+    if rows:
+        session.execute(insert(Result), rows)
+
+
+def add_results(session, job: Dict, results: List[Dict]):
+    """Replace the re-run checks' stored results for one repo with new ones"""
+    _save_results(session, [(job, results)])
+
+
+def report_results(job: Dict, results: List[Dict]):
+    for result in results:
+        print(f"    {result['check']}: {result['score']} - {result['reason']}")
+
+    # Calculate overall score
+    total_score = sum(r['score'] for r in results) / len(results) if results else 0
+    print(f"  ✓ Overall Score: {total_score:.2f}\n")
+
+
+@contextmanager
+def stage_pools(static_workers: int = DEFAULT_STATIC_WORKERS,
+                llm_workers: int = DEFAULT_LLM_WORKERS,
+                browser_workers: int = DEFAULT_BROWSER_WORKERS,
+                pages_per_browser: int = DEFAULT_PAGES_PER_BROWSER,
+                browser_engine: str = 'sync',
+                contexts_per_browser: int = DEFAULT_CONTEXTS_PER_BROWSER,
+                batch_checks: bool = True,
+                llm_mode: str = DEFAULT_LLM_MODE):
+    """
+    Browsers and stage pools shared by every repo evaluated inside the block
+
+    Yields evaluate_repo bound to them: call it with a job from any thread.
+    """
+    # The sync engine drives one page per browser; the async engine runs
+    # several contexts per browser on a background event loop
+    if browser_engine == 'async':
+        browsers = AsyncCheckRunner(browser_workers, contexts_per_browser, pages_per_browser)
+        run_checks = partial(browsers.run_dynamic_checks, batch=batch_checks)
+        browser_slots = browser_workers * contexts_per_browser
+    else:
+        browsers = BrowserPool(browser_workers, pages_per_browser)
+        run_checks = partial(run_dynamic_checks, pool=browsers, batch=batch_checks)
+        browser_slots = browser_workers
+
+    with browsers, \
+         ThreadPoolExecutor(static_workers) as static_pool, \
+         ThreadPoolExecutor(llm_workers) as llm_pool, \
+         ThreadPoolExecutor(browser_slots) as browser_pool:
+        yield partial(evaluate_repo, static_pool=static_pool, llm_pool=llm_pool,
+                      browser_pool=browser_pool, run_checks=run_checks, llm_mode=llm_mode)
+
+
+def evaluate_all_repos(workers: int = 1,
+                       static_workers: int = DEFAULT_STATIC_WORKERS,
+                       llm_workers: int = DEFAULT_LLM_WORKERS,
+                       browser_workers: int = DEFAULT_BROWSER_WORKERS,
+                       batch_size: int = DEFAULT_BATCH_SIZE,
+                       pages_per_browser: int = DEFAULT_PAGES_PER_BROWSER,
+                       browser_engine: str = 'sync',
+                       contexts_per_browser: int = DEFAULT_CONTEXTS_PER_BROWSER,
+                       batch_checks: bool = True,
+                       prefetch: bool = False,
+                       llm_mode: str = DEFAULT_LLM_MODE):
+    """Evaluate all submitted repositories"""
+
+    session = get_session()
+
+    # Get all repos that haven't been fully evaluated
+    repos = session.query(Repo).all()
+
+    if prefetch:
+        print("Prefetching repository metadata...")
+        prefetch_metadata(session, [repo.repo_url for repo in repos])
+    jobs = []
+
+    # Tasks and stored fingerprints for the whole run, one query each
+    tasks = _load_tasks(session)
+    stored = _load_fingerprints(session)
+
+    for repo in repos:
+        # Only checks whose inputs or code changed, or that errored, are re-run
+        job = build_job(session, repo, llm_mode, tasks, stored.get(_submission_key(repo), {}))
+        if job and job['rerun']:
+            jobs.append(job)
+
+    print(f"Evaluating {len(jobs)} repositories "
+          f"({len(repos) - len(jobs)} up to date or skipped, {workers} in parallel)...\n")
+
+    pending = []
+
+    with stage_pools(static_workers, llm_workers, browser_workers, pages_per_browser,
+                     browser_engine, contexts_per_browser, batch_checks, llm_mode) as run_repo, \
+         ThreadPoolExecutor(workers) as repo_pool:
+
+        futures = {repo_pool.submit(run_repo, job): job for job in jobs}
+
+        for i, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            print(f"[{i}/{len(jobs)}] {job['email']} - {job['task']} (Round {job['round']})")
+            print(f"  Repo: {job['repo_url']}")
+            print(f"  Pages: {job['pages_url']}")
+            print(f"  Re-running: {', '.join(sorted(job['rerun']))}")
+
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"  ✗ Evaluation failed: {e}\n")
+                continue
+
+            report_results(job, results)
+
+            # Save results, inserting and committing in batches of repos
+            pending.append((job, results))
+            if len(pending) >= batch_size:
+                _save_results(session, pending)
+                session.commit()
+                pending = []
+
+    _save_results(session, pending)
+    session.commit()
+
     print("=== Evaluation Complete ===")
-    
+
     # Summary
     total_repos = session.query(Repo).count()
-    evaluated_repos = session.query(Result).distinct(Result.repo_url).count()
-    
+    evaluated_repos = session.query(Result.repo_url).distinct().count()
+
     print(f"Total repositories: {total_repos}")
     print(f"Evaluated: {evaluated_repos}")
 
+    llm_cache = cache_stats()
+    print(f"LLM cache: {llm_cache['hits']} hits, {llm_cache['misses']} misses")
+
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Evaluate submitted repositories')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Repositories evaluated in parallel')
+    parser.add_argument('--static-workers', type=int, default=DEFAULT_STATIC_WORKERS,
+                       help='Concurrent static (GitHub) checks')
+    parser.add_argument('--llm-workers', type=int, default=DEFAULT_LLM_WORKERS,
+                       help='Concurrent LLM checks')
+    parser.add_argument('--browser-workers', type=int, default=DEFAULT_BROWSER_WORKERS,
+                       help='Browsers used for dynamic (Playwright) checks')
+    parser.add_argument('--browser-engine', choices=['sync', 'async'], default='sync',
+                       help='Playwright engine; async runs several pages per browser')
+    parser.add_argument('--contexts-per-browser', type=int, default=DEFAULT_CONTEXTS_PER_BROWSER,
+                       help='Pages checked concurrently per browser (async engine)')
+    parser.add_argument('--no-batch-checks', dest='batch_checks', action='store_false',
+                       help='Evaluate each JavaScript check in its own browser round trip')
+    parser.add_argument('--pages-per-browser', type=int, default=DEFAULT_PAGES_PER_BROWSER,
+                       help='Pages a browser serves before it is relaunched')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help='Repositories saved per database commit')
+    parser.add_argument('--llm-mode', choices=['separate', 'combined', 'batch'], default=DEFAULT_LLM_MODE,
+                       help='Score README, code and requirements in separate calls, one call, '
+                            'or skip them for llm_batch.py')
+    parser.add_argument('--prefetch-metadata', action='store_true',
+                       help='Load GitHub metadata for all repos through GraphQL first')
+
+    args = parser.parse_args()
+
     print("""
 ╔══════════════════════════════════════════════════════════╗
 ║  LLM Deployment Evaluation System                        ║
 ║  Running all checks...                                   ║
 ╚══════════════════════════════════════════════════════════╝
     """)
-    
-    evaluate_all_repos()
+
+    evaluate_all_repos(args.workers, args.static_workers, args.llm_workers,
+                       args.browser_workers, args.batch_size, args.pages_per_browser,
+                       args.browser_engine, args.contexts_per_browser, args.batch_checks,
+                       args.prefetch_metadata, args.llm_mode)
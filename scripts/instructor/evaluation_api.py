@@ -3,17 +3,22 @@
 Evaluation API: Accept student submissions
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, HttpUrl
+from sqlalchemy.exc import IntegrityError
 from typing import Optional
 import uvicorn
+import asyncio
 import os
 import sys
+import time
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from db_models import get_session, Task, Repo
+from db_models import get_async_db, run_sync, Task, Repo
+from eval_queue import enqueue_evaluation
+from stats import collect_stats
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -45,13 +50,8 @@ async def health():
     return {"status": "ok"}
 
 
-@app.post("/api/notify")
-async def notify_submission(submission: SubmissionRequest):
-    """
-    Accept student submission and queue for evaluation
-    """
-    session = get_session()
-    
+def _store_submission(session, submission: SubmissionRequest):
+    """Validate and store a submission (runs off the event loop)"""
     try:
         # Validate submission against tasks table
         task = session.query(Task).filter_by(
@@ -99,7 +99,23 @@ async def notify_submission(submission: SubmissionRequest):
         )
         
         session.add(repo)
-        session.commit()
+        
+        try:
+            # The evaluation job is committed with the submission, so
+            # eval_worker.py picks it up without rescanning repos
+            session.flush()
+            enqueue_evaluation(session, repo)
+            session.commit()
+        except IntegrityError:
+            # A concurrent request stored the same submission first
+            session.rollback()
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": "Duplicate submission",
+                    "reason": "This task has already been submitted."
+                }
+            )
         
         print(f"✓ Submission received: {submission.email} - {submission.task} (Round {submission.round})")
         
@@ -110,43 +126,58 @@ async def notify_submission(submission: SubmissionRequest):
             "round": submission.round
         }
         
-    except Exception as e:
+    except Exception:
         session.rollback()
+        raise
+
+
+@app.post("/api/notify")
+async def notify_submission(submission: SubmissionRequest, session=Depends(get_async_db)):
+    """
+    Accept student submission and queue for evaluation
+    """
+    try:
+        return await run_sync(session, _store_submission, submission)
+    except Exception as e:
         print(f"✗ Error processing submission: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
 
 
-@app.get("/api/stats")
-async def get_stats():
-    """Get submission statistics"""
-    session = get_session()
-    
-    try:
-        tasks_sent = session.query(Task).count()
-        repos_submitted = session.query(Repo).count()
-        
-        round1_tasks = session.query(Task).filter_by(round=1).count()
-        round2_tasks = session.query(Task).filter_by(round=2).count()
-        
-        round1_repos = session.query(Repo).filter_by(round=1).count()
-        round2_repos = session.query(Repo).filter_by(round=2).count()
-        
+def _format_stats(stats):
+    """Shape aggregate counts for the API response"""
+    def round_counts(round_num):
+        counts = stats['rounds'].get(round_num, {})
         return {
-            "tasks_sent": tasks_sent,
-            "repos_submitted": repos_submitted,
-            "round1": {
-                "tasks_sent": round1_tasks,
-                "repos_submitted": round1_repos
-            },
-            "round2": {
-                "tasks_sent": round2_tasks,
-                "repos_submitted": round2_repos
-            }
+            "tasks_sent": counts.get('tasks_sent', 0),
+            "repos_submitted": counts.get('repos_submitted', 0),
+            "results": counts.get('results', 0)
         }
-    finally:
-        session.close()
+    
+    totals = stats['totals']
+    return {
+        "tasks_sent": totals['tasks_sent'],
+        "repos_submitted": totals['repos_submitted'],
+        "results": totals['results'],
+        "round1": round_counts(1),
+        "round2": round_counts(2)
+    }
+
+
+# Dashboards poll /api/stats; serve repeated requests from memory for a few seconds
+STATS_CACHE_TTL = float(os.getenv('STATS_CACHE_TTL', 5))
+_stats_cache = {'expires': 0.0, 'value': None}
+_stats_lock = asyncio.Lock()
+
+
+@app.get("/api/stats")
+async def get_stats(session=Depends(get_async_db)):
+    """Get submission statistics"""
+    async with _stats_lock:
+        if _stats_cache['value'] is None or time.monotonic() >= _stats_cache['expires']:
+            stats = await run_sync(session, collect_stats)
+            _stats_cache['value'] = _format_stats(stats)
+            _stats_cache['expires'] = time.monotonic() + STATS_CACHE_TTL
+        return _stats_cache['value']
 
 
 if __name__ == '__main__':
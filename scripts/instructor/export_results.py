@@ -1,80 +1,194 @@
 #!/usr/bin/env python3
 """
-Export evaluation results to CSV
+Export evaluation results to CSV (or Parquet)
 """
 
 import sys
 import os
 import csv
+import gzip
 from datetime import datetime
+from itertools import chain
+from typing import Iterator, Tuple
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import func, case
+
 from db_models import get_session, Result, Repo
 
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional; only needed for --format parquet
+    pyarrow = None
 
-def export_results(output_file='results.csv'):
-    """Export all results to CSV"""
-    
-    session = get_session()
-    
-    # Get all results
-    results = session.query(Result).order_by(Result.timestamp).all()
-    
-    if not results:
-        print("No results found to export")
-        return
-    
-    # Write to CSV
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+
+RESULT_COLUMNS = [
+    'timestamp',
+    'email',
+    'task',
+    'round',
+    'repo_url',
+    'commit_sha',
+    'pages_url',
+    'check',
+    'score',
+    'reason',
+    'logs'
+]
+
+# Rows fetched from the database (and written to Parquet) at a time
+DEFAULT_CHUNK_SIZE = 5000
+PASS_SCORE = 0.7
+
+
+def _output_path(path: str, compress: bool = False) -> str:
+    """File name to write; compressed output always ends in .gz"""
+    if compress and not path.endswith('.gz'):
+        return f'{path}.gz'
+    return path
+
+
+def _open_text(path: str):
+    """Text file for csv.writer; gzip-compressed for .gz paths"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def iter_results(session, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple]:
+    """
+    Result rows in timestamp order, streamed from the database
+
+    yield_per keeps only one chunk in memory; on PostgreSQL it also uses a
+    server-side cursor so the driver does not buffer the whole result set.
+    """
+    query = session.query(
+        Result.timestamp,
+        Result.email,
+        Result.task,
+        Result.round,
+        Result.repo_url,
+        Result.commit_sha,
+        Result.pages_url,
+        Result.check,
+        Result.score,
+        Result.reason,
+        Result.logs
+    ).order_by(Result.timestamp).yield_per(chunk_size)
+
+    for row in query:
+        yield (*row[:10], row.logs[:500] if row.logs else '')
+
+
+def _write_csv(rows: Iterator[Tuple], output_file: str) -> int:
+    count = 0
+    with _open_text(output_file) as f:
         writer = csv.writer(f)
-        
-        # Header
-        writer.writerow([
-            'timestamp',
-            'email',
-            'task',
-            'round',
-            'repo_url',
-            'commit_sha',
-            'pages_url',
-            'check',
-            'score',
-            'reason',
-            'logs'
-        ])
-        
-        # Data
-        for result in results:
-            writer.writerow([
-                result.timestamp.isoformat(),
-                result.email,
-                result.task,
-                result.round,
-                result.repo_url,
-                result.commit_sha,
-                result.pages_url,
-                result.check,
-                result.score,
-                result.reason,
-                result.logs[:500] if result.logs else ''
-            ])
-    
-    print(f"✓ Exported {len(results)} results to {output_file}")
-    
-    # Generate summary
-    export_summary(session, 'summary.csv')
-
-
-def export_summary(session, output_file='summary.csv'):
-    """Export summary with average scores per student"""
-    
-    # Get unique students
-    repos = session.query(Repo).all()
-    
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer.writerow(RESULT_COLUMNS)
+        for row in rows:
+            writer.writerow((row[0].isoformat(), *row[1:]))
+            count += 1
+    return count
+
+
+def _write_parquet(rows: Iterator[Tuple], output_file: str, chunk_size: int) -> int:
+    """Write row groups of chunk_size rows as they arrive"""
+    schema = pyarrow.schema([
+        ('timestamp', pyarrow.timestamp('us')),
+        ('email', pyarrow.string()),
+        ('task', pyarrow.string()),
+        ('round', pyarrow.int64()),
+        ('repo_url', pyarrow.string()),
+        ('commit_sha', pyarrow.string()),
+        ('pages_url', pyarrow.string()),
+        ('check', pyarrow.string()),
+        ('score', pyarrow.float64()),
+        ('reason', pyarrow.string()),
+        ('logs', pyarrow.string()),
+    ])
+
+    def write(writer, chunk):
+        columns = list(zip(*chunk))
+        writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        ))
+
+    count = 0
+    chunk = []
+    with pyarrow.parquet.ParquetWriter(output_file, schema, compression='zstd') as writer:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                write(writer, chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            write(writer, chunk)
+            count += len(chunk)
+    return count
+
+
+def export_results(output_file='results.csv', output_format: str = 'csv', compress: bool = False,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, summary_file='summary.csv'):
+    """Export all results, streaming rows to the file as they are read"""
+
+    if output_format == 'parquet' and pyarrow is None:
+        print("✗ Parquet output needs pyarrow (pip install pyarrow)")
+        return
+
+    session = get_session()
+
+    try:
+        rows = iter_results(session, chunk_size)
+        first = next(rows, None)
+
+        if first is None:
+            print("No results found to export")
+            return
+
+        rows = chain([first], rows)
+        if output_format == 'parquet':
+            count = _write_parquet(rows, output_file, chunk_size)
+        else:
+            output_file = _output_path(output_file, compress)
+            count = _write_csv(rows, output_file)
+
+        print(f"✓ Exported {count} results to {output_file}")
+
+        # Generate summary
+        if summary_file:
+            export_summary(session, summary_file, compress)
+    finally:
+        session.close()
+
+
+def export_summary(session, output_file='summary.csv', compress: bool = False):
+    """Export summary with average scores per submission, aggregated in one query"""
+
+    passed = func.sum(case((Result.score >= PASS_SCORE, 1), else_=0))
+    rows = session.query(
+        Repo.email,
+        Repo.task,
+        Repo.round,
+        Repo.repo_url,
+        Repo.pages_url,
+        func.count(Result.id),
+        func.avg(Result.score),
+        passed
+    ).join(
+        Result,
+        (Result.email == Repo.email) & (Result.task == Repo.task) & (Result.round == Repo.round)
+    ).group_by(
+        Repo.id, Repo.email, Repo.task, Repo.round, Repo.repo_url, Repo.pages_url
+    ).order_by(Repo.id)
+
+    output_file = _output_path(output_file, compress)
+    with _open_text(output_file) as f:
         writer = csv.writer(f)
-        
+
         # Header
         writer.writerow([
             'email',
@@ -87,44 +201,39 @@ def export_summary(session, output_file='summary.csv'):
             'passed_checks',
             'failed_checks'
         ])
-        
+
         # Data
-        for repo in repos:
-            results = session.query(Result).filter_by(
-                email=repo.email,
-                task=repo.task,
-                round=repo.round
-            ).all()
-            
-            if not results:
-                continue
-            
-            total_checks = len(results)
-            avg_score = sum(r.score for r in results) / total_checks
-            passed = sum(1 for r in results if r.score >= 0.7)
-            failed = total_checks - passed
-            
+        for email, task, round_num, repo_url, pages_url, total_checks, avg_score, passed_checks in rows:
             writer.writerow([
-                repo.email,
-                repo.task,
-                repo.round,
-                repo.repo_url,
-                repo.pages_url,
+                email,
+                task,
+                round_num,
+                repo_url,
+                pages_url,
                 total_checks,
                 f"{avg_score:.2f}",
-                passed,
-                failed
+                passed_checks,
+                total_checks - passed_checks
             ])
-    
+
     print(f"✓ Exported summary to {output_file}")
 
 
 if __name__ == '__main__':
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='Export evaluation results')
-    parser.add_argument('--output', default='results.csv', help='Output CSV file')
-    
+    parser.add_argument('--output', default='results.csv', help='Output file')
+    parser.add_argument('--format', dest='output_format', choices=['csv', 'parquet'], default='csv',
+                       help='Output format for results (parquet needs pyarrow)')
+    parser.add_argument('--gzip', action='store_true',
+                       help='Gzip-compress CSV output; .gz is appended to file names that lack it '
+                            '(also implied by a .gz file name)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                       help='Rows fetched and written at a time')
+    parser.add_argument('--summary', default='summary.csv',
+                       help="Summary CSV file ('' to skip)")
+
     args = parser.parse_args()
-    
-    export_results(args.output)
+
+    export_results(args.output, args.output_format, args.gzip, args.chunk_size, args.summary)
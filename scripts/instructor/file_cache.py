@@ -0,0 +1,109 @@
+"""
+Size-bounded on-disk cache for immutable file content
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class FileCache:
+    """
+    Content cache stored as one file per key, evicted least recently used
+
+    Positive entries hold the file text and are touched on every hit so
+    eviction drops the least recently used first. Negative entries record
+    that a file did not exist and expire after `negative_ttl` seconds.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024,
+                 negative_ttl: float = 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str, suffix: str) -> str:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + suffix)
+
+    def get(self, key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Look up a key
+
+        Returns (hit, content); content is None for a cached "not found".
+        """
+        path = self._path(key, '.txt')
+        try:
+            # Bytes, not text mode, so CRLF line endings come back unchanged
+            with open(path, 'rb') as f:
+                content = f.read().decode('utf-8')
+            os.utime(path)
+            return True, content
+        except (FileNotFoundError, UnicodeDecodeError):
+            pass
+
+        missing = self._path(key, '.missing')
+        try:
+            if time.time() - os.path.getmtime(missing) < self.negative_ttl:
+                return True, None
+            os.remove(missing)
+        except FileNotFoundError:
+            pass
+        return False, None
+
+    def set(self, key: str, content: str):
+        data = content.encode('utf-8')
+        path = self._path(key, '.txt')
+        with self._lock:
+            # Replacing an entry only adds the difference in size
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            self._write(path, data)
+            self._size += len(data) - replaced
+            over = self._size > self.max_bytes
+        if over:
+            self._evict()
+
+    def set_missing(self, key: str):
+        self._write(self._path(key, '.missing'), b'')
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at 90% of its limit"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            size = sum(entry[1] for entry in entries)
+            target = self.max_bytes * 0.9
+            for path, entry_size, _ in entries:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                    size -= entry_size
+                except FileNotFoundError:
+                    pass
+            self._size = size
@@ -0,0 +1,100 @@
+"""
+Result fingerprints: Decide which stored check results are still current
+
+Each stored result carries a hash of everything that produced it (commit,
+check expression or prompt version, check code version). A result is
+re-run when its fingerprint changes or when it recorded an error rather
+than a verdict.
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, Optional, Set
+
+from llm_checks import LLM_MODEL, PROMPT_VERSIONS, COMBINED_CHECKS
+
+
+# Bump a check's version when its implementation changes so results
+# produced by the old code are re-run
+CHECK_VERSIONS = {
+    'license_mit': 1,
+    'readme_exists': 1,
+    'repo_timing': 1,
+    'no_secrets': 2,
+    'dynamic': 1,  # JavaScript checks run on the deployed page
+}
+
+STATIC_CHECKS = ('license_mit', 'readme_exists', 'repo_timing', 'no_secrets')
+LLM_CHECKS = COMBINED_CHECKS
+
+# Results recording a failure to evaluate rather than a verdict
+ERROR_CHECKS = {'page_timeout', 'browser_error', 'page_load', 'dynamic_error'}
+_ERROR_REASON = re.compile(r'^(Error (checking|scanning)|Could not fetch|LLM evaluation (error|skipped)|'
+                           r'Check error|Dynamic checks failed)')
+
+
+def fingerprint(check: str, version, *inputs) -> str:
+    payload = json.dumps([check, version, *inputs], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def llm_fingerprint(commit_sha: str, check: str, mode: str = 'separate') -> str:
+    """LLM results depend on the model and on the prompt that produced them"""
+    prompt = 'combined' if mode == 'combined' else check
+    return fingerprint(check, PROMPT_VERSIONS[prompt], commit_sha, LLM_MODEL, mode)
+
+
+def check_fingerprints(job: Dict, llm_mode: str = 'separate') -> Dict[str, str]:
+    """Current fingerprint of every check evaluate.py runs for this job"""
+    sha = job['commit_sha']
+    prints = {
+        'license_mit': fingerprint('license_mit', CHECK_VERSIONS['license_mit'], sha),
+        'readme_exists': fingerprint('readme_exists', CHECK_VERSIONS['readme_exists'], sha),
+        'repo_timing': fingerprint('repo_timing', CHECK_VERSIONS['repo_timing'],
+                                   job['repo_url'], job['task_timestamp']),
+        'no_secrets': fingerprint('no_secrets', CHECK_VERSIONS['no_secrets'], job['repo_url'], sha),
+    }
+
+    # Batch mode leaves LLM results to llm_batch.py
+    if llm_mode != 'batch':
+        for check in LLM_CHECKS:
+            prints[check] = llm_fingerprint(sha, check, llm_mode)
+
+    for i, expr in enumerate(job['checks'], 1):
+        prints[f'check_{i}'] = fingerprint('dynamic', CHECK_VERSIONS['dynamic'],
+                                           job['pages_url'], sha, expr)
+    return prints
+
+
+def is_error(result: Dict) -> bool:
+    return result['check'] in ERROR_CHECKS or bool(_ERROR_REASON.match(result.get('reason') or ''))
+
+
+def result_fingerprint(fingerprints: Dict[str, str], result: Dict) -> Optional[str]:
+    """Fingerprint to store with a result; None for errors so they are re-run"""
+    if is_error(result):
+        return None
+    return fingerprints.get(result['check'])
+
+
+def stale_checks(fingerprints: Dict[str, str], stored: Dict[str, Optional[str]],
+                 llm_mode: str = 'separate') -> Set[str]:
+    """
+    Checks to re-run given the stored {check: fingerprint}
+
+    Stored results that are no longer produced (errors, removed checks) are
+    stale too, so they get replaced. LLM checks are skipped when README or
+    index.html is missing, so a missing LLM result only counts once the
+    static stage, which re-reads that content, runs again anyway.
+    """
+    stale = {check for check, current in fingerprints.items()
+             if check in stored and stored[check] != current}
+    stale |= {check for check in stored
+              if check not in fingerprints and not (llm_mode == 'batch' and check in LLM_CHECKS)}
+
+    missing = {check for check in fingerprints if check not in stored}
+    stale |= missing - set(LLM_CHECKS)
+    if stale & set(STATIC_CHECKS):
+        stale |= missing
+    return stale
@@ -0,0 +1,172 @@
+"""
+Shared GitHub HTTP client: pooled connections, auth, ETags and rate limits
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', '')
+# Requests kept in hand per rate-limit window before pausing until reset
+GITHUB_RATE_LIMIT_RESERVE = int(os.getenv('GITHUB_RATE_LIMIT_RESERVE', 5))
+GITHUB_MAX_RETRIES = int(os.getenv('GITHUB_MAX_RETRIES', 3))
+GITHUB_POOL_SIZE = int(os.getenv('GITHUB_POOL_SIZE', 32))
+ETAG_CACHE_SIZE = 2048
+
+_AUTH_HOSTS = ('api.github.com', 'raw.githubusercontent.com', 'codeload.github.com')
+
+
+class GitHubClient:
+    """
+    Keep-alive session for api.github.com and raw/codeload downloads
+
+    API responses are revalidated with If-None-Match, so unchanged data
+    comes back as a 304 that does not count against the rate limit. The
+    X-RateLimit-* headers of each response are tracked per resource and
+    requests pause until the window resets once only `reserve` remain.
+    403/429 rate-limit responses are retried after the advertised wait.
+    """
+
+    def __init__(self, token: str = GITHUB_TOKEN, reserve: int = GITHUB_RATE_LIMIT_RESERVE,
+                 max_retries: int = GITHUB_MAX_RETRIES, pool_size: int = GITHUB_POOL_SIZE,
+                 session: requests.Session = None, sleep=time.sleep):
+        self.token = token
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self._etags = OrderedDict()
+        self._limits: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, timeout: float = 10, stream: bool = False,
+                **kwargs) -> requests.Response:
+        host = urlparse(url).hostname or ''
+        headers = dict(kwargs.pop('headers', None) or {})
+        if self.token and host in _AUTH_HOSTS:
+            headers.setdefault('Authorization', f'Bearer {self.token}')
+
+        # Callers sending their own If-None-Match handle the 304 themselves
+        use_etag = (method == 'GET' and host == 'api.github.com' and not stream
+                    and not kwargs.get('params') and 'If-None-Match' not in headers)
+        resource = 'graphql' if url.rstrip('/').endswith('/graphql') else 'core'
+        cached = None
+        if use_etag:
+            with self._lock:
+                cached = self._etags.get(url)
+                if cached is not None:
+                    self._etags.move_to_end(url)
+            if cached is not None:
+                headers['If-None-Match'] = cached.headers['ETag']
+
+        for attempt in range(self.max_retries + 1):
+            if host == 'api.github.com':
+                self._wait_for_budget(resource)
+
+            response = self.session.request(method, url, headers=headers, timeout=timeout,
+                                            stream=stream, **kwargs)
+            self._record_limits(response)
+
+            delay = self._retry_delay(response)
+            if delay is None or attempt == self.max_retries:
+                break
+            print(f"  ⊘ GitHub rate limit hit, waiting {delay:.0f}s")
+            response.close()
+            self.sleep(delay)
+
+        if use_etag:
+            if response.status_code == 304 and cached is not None:
+                return cached
+            if response.status_code == 200 and response.headers.get('ETag'):
+                with self._lock:
+                    self._etags[url] = response
+                    if len(self._etags) > ETAG_CACHE_SIZE:
+                        self._etags.popitem(last=False)
+
+        return response
+
+    def _record_limits(self, response: requests.Response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        resource = response.headers.get('X-RateLimit-Resource', 'core')
+        with self._lock:
+            self._limits[resource] = {'remaining': int(remaining), 'reset': float(reset)}
+
+    def _wait_for_budget(self, resource: str = 'core'):
+        """
+        Pause while the resource's budget is down to the reserve
+
+        The limit entry stays in place until its reset time has passed, so
+        every thread that asks in the meantime waits too, not just the first.
+        """
+        with self._lock:
+            limit = self._limits.get(resource)
+            if limit is not None and time.time() >= limit['reset']:
+                # Assume the window is fresh once it resets; the next response corrects it
+                del self._limits[resource]
+                limit = None
+            if limit is None or limit['remaining'] > self.reserve:
+                if limit is not None:
+                    # Count this request so concurrent callers see the budget shrink
+                    limit['remaining'] -= 1
+                return
+            wait = limit['reset'] - time.time()
+
+        print(f"  ⊘ GitHub rate limit nearly spent, pausing {wait:.0f}s until reset")
+        self.sleep(wait + 1)
+
+    @staticmethod
+    def _retry_delay(response: requests.Response) -> Optional[float]:
+        """Seconds to wait before retrying a rate-limited response, None otherwise"""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            return float(retry_after)
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            reset = float(response.headers.get('X-RateLimit-Reset', time.time()))
+            return max(reset - time.time(), 0) + 1
+        if response.status_code == 429:
+            return 60.0
+        return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> GitHubClient:
+    """Process-wide client shared by every check"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GitHubClient()
+    return _client
+
+
+def github_get(url: str, **kwargs) -> requests.Response:
+    return get_client().get(url, **kwargs)
+
+
+def github_post(url: str, **kwargs) -> requests.Response:
+    return get_client().post(url, **kwargs)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Gradebook: Weighted scores per submission, student and check with pandas
+"""
+
+import sys
+import os
+import json
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from sqlalchemy import select
+
+from db_models import get_engine, Task, Repo, Result
+
+try:
+    import pyarrow
+except ImportError:  # Optional; only needed for Parquet / Feather output
+    pyarrow = None
+
+
+PASS_SCORE = 0.7
+# Relative weight of each check in a submission's score; JavaScript checks
+# from the task (check_1, check_2, ...) share the 'check_*' weight and any
+# check not listed counts 1.0. Override with --weights weights.json.
+DEFAULT_CHECK_WEIGHTS = {}
+DEFAULT_ROUND_WEIGHTS = {1: 1.0, 2: 1.0}
+
+SUBMISSION_KEY = ['email', 'task', 'round', 'repo_url']
+
+
+def load_frames(engine=None) -> Dict[str, pd.DataFrame]:
+    """results, repos and tasks as DataFrames, one bulk query each"""
+    engine = engine or get_engine()
+
+    results = pd.read_sql_query(select(
+        Result.timestamp, Result.email, Result.task, Result.round, Result.repo_url,
+        Result.check, Result.score
+    ), engine)
+    repos = pd.read_sql_query(select(
+        Repo.email, Repo.task, Repo.round, Repo.repo_url, Repo.pages_url, Repo.commit_sha,
+        Repo.timestamp.label('submitted_at')
+    ), engine)
+    tasks = pd.read_sql_query(select(
+        Task.email, Task.task, Task.round, Task.timestamp.label('sent_at')
+    ), engine)
+
+    # A check stored twice for one submission counts once (the newest)
+    results = results.sort_values('timestamp').drop_duplicates(SUBMISSION_KEY + ['check'], keep='last')
+
+    return {'results': results, 'repos': repos, 'tasks': tasks}
+
+
+def check_weights(checks: pd.Series, weights: Dict[str, float]) -> pd.Series:
+    key = checks.where(~checks.str.fullmatch(r'check_\d+'), 'check_*')
+    return key.map(weights).fillna(1.0).astype(float)
+
+
+def submission_scores(results: pd.DataFrame, repos: pd.DataFrame,
+                      weights: Dict[str, float] = DEFAULT_CHECK_WEIGHTS) -> pd.DataFrame:
+    """One row per submission: weighted and plain average, passed / failed counts"""
+    scored = results.assign(
+        weight=check_weights(results['check'], weights),
+        passed=(results['score'] >= PASS_SCORE).astype(int)
+    )
+    scored['weighted'] = scored['score'] * scored['weight']
+
+    grouped = scored.groupby(SUBMISSION_KEY).agg(
+        total_checks=('check', 'size'),
+        average_score=('score', 'mean'),
+        weighted_sum=('weighted', 'sum'),
+        weight_total=('weight', 'sum'),
+        passed_checks=('passed', 'sum')
+    ).reset_index()
+
+    grouped['weighted_score'] = grouped['weighted_sum'] / grouped['weight_total'].where(grouped['weight_total'] > 0)
+    grouped['failed_checks'] = grouped['total_checks'] - grouped['passed_checks']
+    grouped = grouped.drop(columns=['weighted_sum', 'weight_total'])
+
+    return grouped.merge(repos, on=SUBMISSION_KEY, how='left')
+
+
+def student_scores(submissions: pd.DataFrame, tasks: pd.DataFrame,
+                   round_weights: Dict[int, float] = DEFAULT_ROUND_WEIGHTS) -> pd.DataFrame:
+    """
+    One row per student: best weighted score per round and an overall grade
+
+    Rounds a student was sent a task for but has no evaluated submission in
+    count as 0 in the overall grade.
+    """
+    per_round = submissions.groupby(['email', 'round'])['weighted_score'].max()
+    assigned = pd.MultiIndex.from_frame(tasks[['email', 'round']].drop_duplicates())
+    per_round = per_round.reindex(per_round.index.union(assigned)).fillna(0.0)
+
+    rounds = per_round.rename('score').reset_index()
+    rounds['weight'] = rounds['round'].map(round_weights).fillna(1.0)
+    rounds['weighted'] = rounds['score'] * rounds['weight']
+    totals = rounds.groupby('email')[['weighted', 'weight']].sum()
+
+    table = per_round.unstack('round')
+    table.columns = [f'round_{r}' for r in table.columns]
+    table['overall'] = totals['weighted'] / totals['weight']
+    table['submissions'] = submissions.groupby('email').size().reindex(table.index).fillna(0).astype(int)
+    return table.reset_index()
+
+
+def check_summary(results: pd.DataFrame) -> pd.DataFrame:
+    """Per round and check: how many were evaluated, mean score and pass rate"""
+    return results.assign(passed=results['score'] >= PASS_SCORE).groupby(['round', 'check']).agg(
+        evaluated=('score', 'size'),
+        mean_score=('score', 'mean'),
+        pass_rate=('passed', 'mean')
+    ).reset_index()
+
+
+def build_gradebook(frames: Dict[str, pd.DataFrame],
+                    weights: Dict[str, float] = DEFAULT_CHECK_WEIGHTS,
+                    round_weights: Dict[int, float] = DEFAULT_ROUND_WEIGHTS) -> Dict[str, pd.DataFrame]:
+    submissions = submission_scores(frames['results'], frames['repos'], weights)
+    return {
+        'submissions': submissions,
+        'students': student_scores(submissions, frames['tasks'], round_weights),
+        'checks': check_summary(frames['results']),
+    }
+
+
+def _summary_csv(submissions: pd.DataFrame) -> pd.DataFrame:
+    """The columns export_results.py writes to summary.csv"""
+    summary = submissions[['email', 'task', 'round', 'repo_url', 'pages_url', 'total_checks',
+                           'average_score', 'passed_checks', 'failed_checks']].copy()
+    summary['average_score'] = summary['average_score'].map(lambda score: f"{score:.2f}")
+    return summary
+
+
+def write_gradebook(tables: Dict[str, pd.DataFrame], output_dir: str,
+                    formats: List[str] = ('csv',)) -> List[str]:
+    """Write every table in each format; returns the files written"""
+    if pyarrow is None and set(formats) & {'parquet', 'feather'}:
+        raise RuntimeError("Parquet and Feather output need pyarrow (pip install pyarrow)")
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+
+    for name, table in tables.items():
+        base = os.path.join(output_dir, f'gradebook_{name}')
+        if 'csv' in formats:
+            table.to_csv(f'{base}.csv', index=False, float_format='%.4f')
+            written.append(f'{base}.csv')
+        if 'parquet' in formats:
+            table.to_parquet(f'{base}.parquet', index=False)
+            written.append(f'{base}.parquet')
+        if 'feather' in formats:
+            table.reset_index(drop=True).to_feather(f'{base}.feather')
+            written.append(f'{base}.feather')
+
+    # Same layout as export_results.py's summary.csv
+    if 'csv' in formats:
+        path = os.path.join(output_dir, 'summary.csv')
+        _summary_csv(tables['submissions']).to_csv(path, index=False)
+        written.append(path)
+
+    return written
+
+
+def _load_weights(path: str) -> Dict:
+    with open(path, encoding='utf-8') as f:
+        weights = json.load(f)
+    return {
+        'checks': weights.get('checks', DEFAULT_CHECK_WEIGHTS),
+        'rounds': {int(r): w for r, w in weights.get('rounds', DEFAULT_ROUND_WEIGHTS).items()},
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the gradebook from evaluation results')
+    parser.add_argument('--output-dir', default='gradebook', help='Directory for the output files')
+    parser.add_argument('--format', dest='formats', action='append', choices=['csv', 'parquet', 'feather'],
+                       help='Output format; repeat for several (default: csv)')
+    parser.add_argument('--weights',
+                       help='JSON file with {"checks": {name: weight}, "rounds": {round: weight}}')
+
+    args = parser.parse_args()
+
+    weights = _load_weights(args.weights) if args.weights else \
+        {'checks': DEFAULT_CHECK_WEIGHTS, 'rounds': DEFAULT_ROUND_WEIGHTS}
+
+    frames = load_frames()
+    if frames['results'].empty:
+        print("No results found")
+        sys.exit(0)
+
+    print(f"Loaded {len(frames['results'])} results for {len(frames['repos'])} submissions")
+    tables = build_gradebook(frames, weights['checks'], weights['rounds'])
+
+    try:
+        written = write_gradebook(tables, args.output_dir, args.formats or ['csv'])
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    for path in written:
+        print(f"✓ Wrote {path}")
@@ -15,4 +15,4 @@ if __name__ == '__main__':
     print("Initializing database...")
     init_database()
     print("\nDatabase setup complete!")
-    print("Tables created: tasks, repos, results")
+    print("Tables created: tasks, repos, results, deliveries, evaluation_jobs, repo_metadata, llm_cache")
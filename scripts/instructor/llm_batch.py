@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Offline LLM batches: Prepare, submit and ingest LLM checks for a whole round
+"""
+
+import sys
+import os
+import json
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from dotenv import load_dotenv
+
+from db_models import get_session, Task, Repo, Result
+from static_checks import get_file_content
+from llm_cache import get_cached, store
+from llm_checks import (
+    LLM_MODEL,
+    PROMPT_VERSIONS,
+    COMBINED_CHECKS,
+    plan_requests,
+    parse_answer,
+    request_cache_key
+)
+from fingerprints import llm_fingerprint, result_fingerprint, is_error
+
+load_dotenv()
+
+REQUESTS_FILE = 'requests.jsonl'
+MANIFEST_FILE = 'manifest.json'
+OUTPUT_FILE = 'output.jsonl'
+CHAT_ENDPOINT = '/v1/chat/completions'
+# The local backend only calls the LLM API when explicitly enabled
+LOCAL_BACKEND_LIVE = os.getenv('LLM_BATCH_LOCAL_LIVE', 'false').lower() in ('1', 'true', 'yes')
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for a batch API
+
+    Batches are directories under `directory`. The first status() call
+    answers every request with `responder(body)` and writes output in the
+    OpenAI batch output format, so ingestion is exercised end to end.
+    Without a responder, requests are answered with errors unless `live`
+    (or LLM_BATCH_LOCAL_LIVE) allows real calls through the shared LLM client.
+    """
+
+    name = 'local'
+
+    def __init__(self, directory: str, responder: Callable[[Dict], str] = None,
+                 live: bool = LOCAL_BACKEND_LIVE):
+        self.directory = directory
+        self.responder = responder or (self._chat if live else self._offline)
+
+    @staticmethod
+    def _chat(body: Dict) -> str:
+        from llm_client import chat
+        body = dict(body)
+        return chat(os.getenv('OPENAI_API_KEY'), body.pop('model'), **body)
+
+    @staticmethod
+    def _offline(body: Dict) -> str:
+        raise RuntimeError("Local batch backend is offline; set LLM_BATCH_LOCAL_LIVE=true to call the LLM API")
+
+    def submit(self, requests_path: str) -> str:
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.directory, batch_id))
+        shutil.copy(requests_path, os.path.join(self.directory, batch_id, REQUESTS_FILE))
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        batch_dir = os.path.join(self.directory, batch_id)
+        output_path = os.path.join(batch_dir, OUTPUT_FILE)
+        if not os.path.exists(output_path):
+            with open(os.path.join(batch_dir, REQUESTS_FILE)) as f_in, \
+                 open(output_path + '.tmp', 'w') as f_out:
+                for line in f_in:
+                    item = json.loads(line)
+                    f_out.write(json.dumps(self._answer(item)) + '\n')
+            os.replace(output_path + '.tmp', output_path)
+        return 'completed'
+
+    def _answer(self, item: Dict) -> Dict:
+        try:
+            content = self.responder(item['body'])
+        except Exception as e:
+            return {'custom_id': item['custom_id'], 'response': None,
+                    'error': {'message': str(e)}}
+        return {
+            'custom_id': item['custom_id'],
+            'response': {'status_code': 200,
+                         'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}},
+            'error': None
+        }
+
+    def download(self, batch_id: str, dest: str) -> bool:
+        output_path = os.path.join(self.directory, batch_id, OUTPUT_FILE)
+        if not os.path.exists(output_path):
+            return False
+        shutil.copy(output_path, dest)
+        return True
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API (24h completion window, discounted pricing)"""
+
+    name = 'openai'
+    base_url = 'https://api.openai.com/v1'
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f'Bearer {self.api_key}'
+
+    def _check(self, response: requests.Response) -> Dict:
+        if response.status_code >= 400:
+            raise RuntimeError(f"OpenAI batch API error {response.status_code}: {response.text[:300]}")
+        return response.json()
+
+    def submit(self, requests_path: str) -> str:
+        with open(requests_path, 'rb') as f:
+            uploaded = self._check(self.session.post(
+                f'{self.base_url}/files', data={'purpose': 'batch'},
+                files={'file': (REQUESTS_FILE, f)}, timeout=300
+            ))
+        batch = self._check(self.session.post(
+            f'{self.base_url}/batches', timeout=30,
+            json={'input_file_id': uploaded['id'], 'endpoint': CHAT_ENDPOINT,
+                  'completion_window': '24h'}
+        ))
+        return batch['id']
+
+    def _batch(self, batch_id: str) -> Dict:
+        return self._check(self.session.get(f'{self.base_url}/batches/{batch_id}', timeout=30))
+
+    def status(self, batch_id: str) -> str:
+        return self._batch(batch_id)['status']
+
+    def download(self, batch_id: str, dest: str) -> bool:
+        batch = self._batch(batch_id)
+        if batch['status'] != 'completed' or not batch.get('output_file_id'):
+            return False
+        with self.session.get(f"{self.base_url}/files/{batch['output_file_id']}/content",
+                              stream=True, timeout=300) as response:
+            response.raise_for_status()
+            with open(dest, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+        return True
+
+
+def get_backend(name: str, batch_dir: str):
+    if name == 'openai':
+        return OpenAIBatchBackend()
+    return LocalBatchBackend(os.path.join(batch_dir, 'local-backend'))
+
+
+def _llm_rows(session):
+    """(submission key + check, id, errored) for every stored LLM check result"""
+    for row in session.query(Result.id, Result.email, Result.task, Result.round, Result.repo_url,
+                             Result.check, Result.reason).filter(Result.check.in_(COMBINED_CHECKS)):
+        yield (row.email, row.task, row.round, row.repo_url, row.check), row.id, \
+            is_error({'check': row.check, 'reason': row.reason})
+
+
+def _pending_repos(session) -> List[Dict]:
+    """Repos with no LLM check results or with errored ones, with their task brief"""
+    evaluated, errored = set(), set()
+    for key, _, error in _llm_rows(session):
+        (errored if error else evaluated).add(key[:4])
+    evaluated -= errored
+
+    rows = session.query(Repo, Task.brief).join(
+        Task, (Task.email == Repo.email) & (Task.task == Repo.task) & (Task.round == Repo.round)
+    ).all()
+
+    pending, seen = [], set()
+    for repo, brief in rows:
+        key = (repo.email, repo.task, repo.round, repo.repo_url)
+        if key in evaluated or key in seen:
+            continue
+        seen.add(key)
+        pending.append({
+            'email': repo.email,
+            'task': repo.task,
+            'round': repo.round,
+            'repo_url': repo.repo_url,
+            'commit_sha': repo.commit_sha,
+            'pages_url': repo.pages_url,
+            'brief': brief
+        })
+    return pending
+
+
+def _load_content(repo: Dict):
+    readme = get_file_content(repo['repo_url'], repo['commit_sha'], 'README.md')
+    code = get_file_content(repo['repo_url'], repo['commit_sha'], 'index.html')
+    return readme, code
+
+
+def _result_row(repo: Dict, check: str, score: float, reason: str, logs: str) -> Dict:
+    return {'email': repo['email'], 'task': repo['task'], 'round': repo['round'],
+            'repo_url': repo['repo_url'], 'commit_sha': repo['commit_sha'],
+            'pages_url': repo['pages_url'], 'check': check, 'score': score,
+            'reason': reason, 'logs': logs}
+
+
+def prepare(batch_dir: str, mode: str = 'separate', workers: int = 8) -> Dict:
+    """
+    Write requests.jsonl and manifest.json for every repo missing LLM results
+
+    Answers already in the LLM cache and results decided without the LLM
+    (empty or short content) go straight into the manifest and are stored
+    at ingest time without being sent. Files too long for one prompt are
+    sent in parts, recorded as a group and merged at ingest.
+    """
+    session = get_session()
+    repos = _pending_repos(session)
+    session.close()
+
+    os.makedirs(batch_dir, exist_ok=True)
+    print(f"Fetching README.md and index.html for {len(repos)} repositories...")
+    with ThreadPoolExecutor(workers) as pool:
+        contents = list(pool.map(_load_content, repos))
+
+    manifest = {'mode': mode, 'model': LLM_MODEL, 'created_at': time.time(),
+                'backend': None, 'batch_id': None, 'requests': {}, 'groups': {}, 'results': []}
+    sent = cached = 0
+
+    with open(os.path.join(batch_dir, REQUESTS_FILE), 'w') as f:
+        for repo, (readme, code) in zip(repos, contents):
+            decided, planned = plan_requests(readme, code, repo['brief'], mode)
+            for check, (score, reason, logs) in decided.items():
+                manifest['results'].append(_result_row(repo, check, score, reason, logs))
+
+            for items in _group_parts(planned):
+                keys = [request_cache_key(item['check'], item['request']) for item in items]
+                answers = [get_cached(key) for key in keys]
+                cached += sum(answer is not None for answer in answers)
+                first = items[0]
+                weights = [item['weight'] for item in items] if 'part' in first else None
+
+                if all(answer is not None for answer in answers):
+                    scored = parse_answer(first['check'], first['wanted'],
+                                          answers if weights else answers[0], weights)
+                    for check, values in scored.items():
+                        manifest['results'].append(_result_row(repo, check, *values))
+                    continue
+
+                entry = {'repo': {k: v for k, v in repo.items() if k != 'brief'},
+                         'check': first['check'], 'wanted': first['wanted']}
+                if weights:
+                    # Parts of one file are merged once every answer is in
+                    group_id = f"group-{len(manifest['groups'])}"
+                    manifest['groups'][group_id] = {**entry, 'weights': weights, 'answers': answers}
+
+                for i, (item, key, answer) in enumerate(zip(items, keys, answers)):
+                    if answer is not None:
+                        continue
+                    custom_id = f"req-{sent}"
+                    f.write(json.dumps({
+                        'custom_id': custom_id,
+                        'method': 'POST',
+                        'url': CHAT_ENDPOINT,
+                        'body': {'model': LLM_MODEL, **item['request']}
+                    }) + '\n')
+                    manifest['requests'][custom_id] = {**entry, 'cache_key': key}
+                    if weights:
+                        manifest['requests'][custom_id].update(group=group_id, part=i)
+                    sent += 1
+
+    _write_manifest(batch_dir, manifest)
+    print(f"✓ Prepared {sent} requests ({cached} answered from cache, "
+          f"{len(manifest['results'])} results ready) in {batch_dir}")
+    return manifest
+
+
+def _group_parts(planned: List[Dict]) -> List[List[Dict]]:
+    """Planned requests grouped so the parts of one split file stay together"""
+    groups = []
+    for item in planned:
+        if item.get('part', (0,))[0] > 0:
+            groups[-1].append(item)
+        else:
+            groups.append([item])
+    return groups
+
+
+def _read_manifest(batch_dir: str) -> Dict:
+    with open(os.path.join(batch_dir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def _write_manifest(batch_dir: str, manifest: Dict):
+    path = os.path.join(batch_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+def submit(batch_dir: str, backend_name: str = 'openai', backend=None) -> Optional[str]:
+    manifest = _read_manifest(batch_dir)
+    if not manifest['requests']:
+        print("⊘ Nothing to submit; run ingest to store the ready results")
+        return None
+
+    backend = backend or get_backend(backend_name, batch_dir)
+    backend_name = backend.name
+    batch_id = backend.submit(os.path.join(batch_dir, REQUESTS_FILE))
+    manifest['backend'] = backend_name
+    manifest['batch_id'] = batch_id
+    _write_manifest(batch_dir, manifest)
+    print(f"✓ Submitted {len(manifest['requests'])} requests as {batch_id} ({backend_name})")
+    return batch_id
+
+
+def status(batch_dir: str, backend=None) -> Optional[str]:
+    manifest = _read_manifest(batch_dir)
+    if not manifest.get('batch_id'):
+        print("⊘ Batch not submitted")
+        return None
+    backend = backend or get_backend(manifest['backend'], batch_dir)
+    state = backend.status(manifest['batch_id'])
+    print(f"{manifest['batch_id']}: {state}")
+    return state
+
+
+def ingest(batch_dir: str, backend=None) -> int:
+    """
+    Store batch answers (and results decided at prepare time) in results
+
+    Rows already present for the same submission and check are not
+    duplicated, so ingest can be re-run safely; stored errors are replaced
+    by successful answers. Parsed answers are also written to the LLM cache.
+    """
+    manifest = _read_manifest(batch_dir)
+    rows = list(manifest['results'])
+    failed = 0
+
+    if manifest.get('batch_id'):
+        output_path = os.path.join(batch_dir, OUTPUT_FILE)
+        backend = backend or get_backend(manifest['backend'], batch_dir)
+        if not backend.download(manifest['batch_id'], output_path):
+            print(f"⊘ Batch {manifest['batch_id']} has no output yet")
+            return 0
+
+        groups = {group_id: dict(group, errors=[], answered={}) for group_id, group in manifest.get('groups', {}).items()}
+        with open(output_path) as f:
+            for line in f:
+                answer = json.loads(line)
+                entry = manifest['requests'].get(answer['custom_id'])
+                if entry is None:
+                    continue
+                content, error = _answer_content(answer)
+                if error:
+                    failed += 1
+                if 'group' in entry:
+                    group = groups[entry['group']]
+                    group['answers'][entry['part']] = content
+                    group['answered'][entry['part']] = entry['cache_key']
+                    if error:
+                        group['errors'].append(error)
+                    continue
+                rows.extend(_answer_rows(entry, content, error))
+
+        for group in groups.values():
+            if group['errors']:
+                rows.extend(_error_rows(group, group['errors'][0]))
+            elif all(answer is not None for answer in group['answers']):
+                rows.extend(_group_rows(group))
+
+    session = get_session()
+    existing, errored = set(), {}
+    for key, result_id, error in _llm_rows(session):
+        if error:
+            errored.setdefault(key, []).append(result_id)
+        else:
+            existing.add(key)
+
+    stored = 0
+    replaced = []
+    for row in rows:
+        key = (row['email'], row['task'], row['round'], row['repo_url'], row['check'])
+        # Errored results are replaced, but not by another error
+        if key in existing or (key in errored and is_error(row)):
+            continue
+        existing.add(key)
+        replaced.extend(errored.pop(key, []))
+        fingerprints = {row['check']: llm_fingerprint(row['commit_sha'], row['check'], manifest['mode'])}
+        session.add(Result(**row, fingerprint=result_fingerprint(fingerprints, row)))
+        stored += 1
+    if replaced:
+        session.query(Result).filter(Result.id.in_(replaced)).delete(synchronize_session=False)
+    session.commit()
+    session.close()
+
+    print(f"✓ Stored {stored} results ({failed} failed requests)")
+    return stored
+
+
+def _answer_content(answer: Dict):
+    """(response text, None) for a successful batch answer, else (None, error message)"""
+    response = answer.get('response') or {}
+    if answer.get('error') or response.get('status_code') != 200:
+        return None, (answer.get('error') or {}).get('message') or f"HTTP {response.get('status_code')}"
+    return response['body']['choices'][0]['message']['content'].strip(), None
+
+
+def _error_rows(entry: Dict, error: str) -> List[Dict]:
+    return [_result_row(entry['repo'], check, 0.5, f"LLM evaluation error: {error}", '')
+            for check in entry['wanted']]
+
+
+def _answer_rows(entry: Dict, content: Optional[str], error: Optional[str]) -> List[Dict]:
+    if error:
+        return _error_rows(entry, error)
+
+    try:
+        scored = parse_answer(entry['check'], entry['wanted'], content)
+    except (ValueError, AttributeError) as e:
+        return _error_rows(entry, str(e))
+
+    store(entry['cache_key'], entry['check'], LLM_MODEL, PROMPT_VERSIONS[entry['check']], content)
+    return [_result_row(entry['repo'], check, *values) for check, values in scored.items()]
+
+
+def _group_rows(group: Dict) -> List[Dict]:
+    """Merged result for the parts of one split file, weighted as in interactive mode"""
+    try:
+        scored = parse_answer(group['check'], group['wanted'], group['answers'], group['weights'])
+    except (ValueError, AttributeError) as e:
+        return _error_rows(group, str(e))
+
+    for part, key in group['answered'].items():
+        store(key, group['check'], LLM_MODEL, PROMPT_VERSIONS[group['check']], group['answers'][part])
+    return [_result_row(group['repo'], check, *values) for check, values in scored.items()]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run LLM checks as an offline batch')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    prepare_parser = subparsers.add_parser('prepare', help='Write requests for repos missing LLM results')
+    prepare_parser.add_argument('batch_dir', help='Directory for the batch files')
+    prepare_parser.add_argument('--mode', choices=['separate', 'combined'], default='separate',
+                               help='One request per rubric item or one per repo')
+    prepare_parser.add_argument('--workers', type=int, default=8,
+                               help='Concurrent file fetches')
+
+    submit_parser = subparsers.add_parser('submit', help='Submit prepared requests')
+    submit_parser.add_argument('batch_dir', help='Directory for the batch files')
+    submit_parser.add_argument('--backend', choices=['openai', 'local'], default='openai',
+                              help='Batch backend (local answers the requests itself; '
+                                   'set LLM_BATCH_LOCAL_LIVE=true to let it call the LLM API)')
+
+    status_parser = subparsers.add_parser('status', help='Show batch status')
+    status_parser.add_argument('batch_dir', help='Directory for the batch files')
+
+    ingest_parser = subparsers.add_parser('ingest', help='Store batch answers as results')
+    ingest_parser.add_argument('batch_dir', help='Directory for the batch files')
+
+    args = parser.parse_args()
+
+    if args.command == 'prepare':
+        prepare(args.batch_dir, args.mode, args.workers)
+    elif args.command == 'submit':
+        submit(args.batch_dir, args.backend)
+    elif args.command == 'status':
+        status(args.batch_dir)
+    elif args.command == 'ingest':
+        ingest(args.batch_dir)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+LLM response cache: Identical prompts are answered from the database
+"""
+
+import sys
+import os
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from db_models import get_session, LLMCache
+
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE', 'true').lower() in ('1', 'true', 'yes')
+LLM_CACHE_MAX_AGE_DAYS = int(os.getenv('LLM_CACHE_MAX_AGE_DAYS', 30))
+
+_counters = {'hits': 0, 'misses': 0}
+_counters_lock = threading.Lock()
+
+
+def cache_key(model: str, prompt_version: int, request: Dict) -> str:
+    """sha256 over everything that affects the response"""
+    payload = json.dumps({'model': model, 'version': prompt_version, 'request': request},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _count(name: str):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def get_cached(key: str, session=None) -> Optional[str]:
+    """Cached response text, or None on a miss"""
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    own_session = session is None
+    session = session or get_session()
+    try:
+        row = session.query(LLMCache.response).filter_by(key=key).first()
+    except SQLAlchemyError as e:
+        # A database without the llm_cache table (init_db.py not re-run)
+        # still evaluates, just without caching
+        print(f"  ⚠ LLM cache unavailable: {e.__class__.__name__}")
+        session.rollback()
+        row = None
+    finally:
+        if own_session:
+            session.close()
+
+    _count('hits' if row else 'misses')
+    return row.response if row else None
+
+
+def store(key: str, check: str, model: str, prompt_version: int, response: str, session=None):
+    if not LLM_CACHE_ENABLED:
+        return
+
+    own_session = session is None
+    session = session or get_session()
+    try:
+        session.add(LLMCache(key=key, check=check, model=model,
+                             prompt_version=prompt_version, response=response))
+        session.commit()
+    except SQLAlchemyError:
+        # Usually an IntegrityError: a concurrent evaluation of identical
+        # content stored it first
+        session.rollback()
+    finally:
+        if own_session:
+            session.close()
+
+
+def cache_stats() -> Dict[str, int]:
+    """Hits and misses in this process"""
+    with _counters_lock:
+        return dict(_counters)
+
+
+def purge_cache(max_age_days: int = LLM_CACHE_MAX_AGE_DAYS, session=None) -> int:
+    """Delete entries older than max_age_days; returns the number removed"""
+    own_session = session is None
+    session = session or get_session()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+        removed = session.query(LLMCache).filter(LLMCache.created_at < cutoff).delete()
+        session.commit()
+        return removed
+    finally:
+        if own_session:
+            session.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    from sqlalchemy import func
+
+    parser = argparse.ArgumentParser(description='Inspect or purge the LLM response cache')
+    parser.add_argument('--purge', action='store_true',
+                       help='Delete entries older than --max-age-days')
+    parser.add_argument('--max-age-days', type=int, default=LLM_CACHE_MAX_AGE_DAYS,
+                       help='Age in days after which entries are purged')
+
+    args = parser.parse_args()
+
+    session = get_session()
+
+    if args.purge:
+        removed = purge_cache(args.max_age_days, session)
+        print(f"✓ Removed {removed} cache entries older than {args.max_age_days} days")
+
+    print("\n=== LLM Cache ===")
+    rows = session.query(LLMCache.check, LLMCache.prompt_version, func.count(LLMCache.id)) \
+        .group_by(LLMCache.check, LLMCache.prompt_version) \
+        .order_by(LLMCache.check, LLMCache.prompt_version).all()
+    for check, version, count in rows:
+        print(f"  {check} v{version}: {count}")
+    if not rows:
+        print("  (empty)")
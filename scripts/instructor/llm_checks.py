@@ -4,27 +4,91 @@ LLM-based checks: Code quality, README quality
 """
 
 import os
-import openai
-from typing import Dict, Tuple
+import json
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from llm_cache import cache_key, get_cached, store
+from llm_client import chat
+from content_prep import fit_to_budget, split_chunks, count_tokens, README_TOKEN_BUDGET, CODE_TOKEN_BUDGET
+
 load_dotenv()
 
+LLM_MODEL = "gpt-3.5-turbo"
 
-def evaluate_readme_quality(readme_content: str) -> Tuple[float, str, str]:
-    """Use LLM to evaluate README quality"""
-    
-    if not readme_content or len(readme_content) < 50:
-        return (0.0, "README is too short or empty", "")
-    
-    try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            return (0.5, "LLM evaluation skipped (no API key)", "")
-        
-        client = openai.OpenAI(api_key=api_key)
-        
-        prompt = f"""Evaluate the quality of this README.md documentation for a student project. 
+# Bump a check's version whenever its prompt changes so cached answers to
+# the old prompt are no longer used
+PROMPT_VERSIONS = {
+    'readme_quality': 2,
+    'code_quality': 2,
+    'requirements_met': 2,
+    'combined': 2,
+}
+
+SYSTEM_PROMPTS = {
+    'readme_quality': "You are a technical documentation evaluator. Respond only with JSON.",
+    'code_quality': "You are a code quality evaluator. Respond only with JSON.",
+    'requirements_met': "You are a requirements verification expert. Respond only with JSON.",
+    'combined': "You are an evaluator of student projects. Respond only with JSON.",
+}
+
+MAX_TOKENS = {'combined': 400}
+
+# Rubric items scored by evaluate_combined, in result order
+COMBINED_CHECKS = ('readme_quality', 'code_quality', 'requirements_met')
+
+DEFAULT_REASONS = {'requirements_met': 'Requirements check completed'}
+
+
+def build_request(check: str, prompt: str) -> Dict:
+    """Chat completion parameters (without the model) for one check"""
+    return {
+        'messages': [
+            {"role": "system", "content": SYSTEM_PROMPTS[check]},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': 0.3,
+        'max_tokens': MAX_TOKENS.get(check, 200)
+    }
+
+
+def request_cache_key(check: str, request: Dict) -> str:
+    return cache_key(LLM_MODEL, PROMPT_VERSIONS[check], request)
+
+
+def _chat_json(check: str, prompt: str) -> Optional[str]:
+    """
+    Ask the model for a JSON answer, served from the cache when possible
+
+    Returns the response text, or None when there is no cached answer and
+    no API key. Only responses that parse as JSON are cached.
+    """
+    request = build_request(check, prompt)
+    key = request_cache_key(check, request)
+
+    cached = get_cached(key)
+    if cached is not None:
+        return cached
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        return None
+
+    # Rate limiting and retries are handled by the shared client
+    result_text = chat(api_key, LLM_MODEL, **request)
+
+    json.loads(result_text)
+    store(key, check, LLM_MODEL, PROMPT_VERSIONS[check], result_text)
+    return result_text
+
+
+def _part_note(part: Optional[str], what: str) -> str:
+    return f" This is {part} of a long {what}; judge only this part." if part else ""
+
+
+def readme_prompt(readme_content: str, part: str = None) -> str:
+    readme_content = fit_to_budget(readme_content, README_TOKEN_BUDGET, 'markdown')
+    return f"""Evaluate the quality of this README.md documentation for a student project.{_part_note(part, 'README')}
 
 Rate it on a scale of 0.0 to 1.0 based on:
 - Clarity and completeness
@@ -34,51 +98,15 @@ Rate it on a scale of 0.0 to 1.0 based on:
 - Grammar and formatting
 
 README Content:
-{readme_content[:3000]}
+{readme_content}
 
 Respond ONLY with a JSON object in this format:
 {{"score": 0.85, "reason": "Well-structured with clear examples but missing installation details"}}"""
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a technical documentation evaluator. Respond only with JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=200
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        import json
-        result = json.loads(result_text)
-        
-        score = float(result.get('score', 0.5))
-        reason = result.get('reason', 'LLM evaluation completed')
-        
-        return (score, reason, result_text)
-        
-    except Exception as e:
-        print(f"  ⚠ LLM README evaluation error: {e}")
-        return (0.5, f"LLM evaluation error: {str(e)}", "")
-
 
-def evaluate_code_quality(code_content: str, language: str = 'javascript') -> Tuple[float, str, str]:
-    """Use LLM to evaluate code quality"""
-    
-    if not code_content or len(code_content) < 50:
-        return (0.0, "Code is too short or empty", "")
-    
-    try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            return (0.5, "LLM evaluation skipped (no API key)", "")
-        
-        client = openai.OpenAI(api_key=api_key)
-        
-        prompt = f"""Evaluate the quality of this {language} code for a student web application project.
+def code_prompt(code_content: str, language: str, part: str = None) -> str:
+    code_content = fit_to_budget(code_content, CODE_TOKEN_BUDGET, 'html')
+    return f"""Evaluate the quality of this {language} code for a student web application project.{_part_note(part, 'file')}
 
 Rate it on a scale of 0.0 to 1.0 based on:
 - Code structure and organization
@@ -89,32 +117,105 @@ Rate it on a scale of 0.0 to 1.0 based on:
 - Performance
 
 Code Content:
-{code_content[:4000]}
+{code_content}
 
 Respond ONLY with a JSON object in this format:
 {{"score": 0.75, "reason": "Clean code with good structure but lacks error handling in fetch calls"}}"""
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a code quality evaluator. Respond only with JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=200
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        import json
-        result = json.loads(result_text)
-        
-        score = float(result.get('score', 0.5))
-        reason = result.get('reason', 'LLM evaluation completed')
-        
-        return (score, reason, result_text)
-        
+
+def completeness_prompt(code_content: str, brief: str) -> str:
+    # Sections sharing words with the brief are kept first
+    code_content = fit_to_budget(code_content, CODE_TOKEN_BUDGET, 'html', context=brief)
+    return f"""Does this code implementation meet the requirements specified in the brief?
+
+Brief Requirements:
+{brief}
+
+Code Implementation:
+{code_content}
+
+Respond ONLY with a JSON object in this format:
+{{"score": 0.9, "reason": "Implements all core requirements but missing optional error messages"}}
+
+Score should be 1.0 if all requirements are met, lower if missing features."""
+
+
+def parse_response(check: str, result_text: str) -> Tuple[float, str, str]:
+    """(score, reason, logs) from a single-check JSON answer"""
+    result = json.loads(result_text)
+
+    score = float(result.get('score', 0.5))
+    reason = result.get('reason', DEFAULT_REASONS.get(check, 'LLM evaluation completed'))
+
+    return (score, reason, result_text)
+
+
+def merge_chunks(scored: List[Tuple[int, Tuple[float, str, str]]]) -> Tuple[float, str, str]:
+    """
+    Merge (token count, result) pairs from the chunks of one file
+
+    The merged score is the mean weighted by each chunk's token count.
+    """
+    total = sum(weight for weight, _ in scored) or 1
+    score = sum(weight * result[0] for weight, result in scored) / total
+    reason = f"Evaluated in {len(scored)} parts: " + "; ".join(result[1] for _, result in scored)
+    logs = "\n".join(result[2] for _, result in scored)
+
+    return (score, reason, logs)
+
+
+def _evaluate_chunks(check: str, chunks: List[str], make_prompt) -> Tuple[float, str, str]:
+    """Score each chunk of an oversized file and merge the answers"""
+    scored = []
+    for i, chunk in enumerate(chunks, 1):
+        result_text = _chat_json(check, make_prompt(chunk, f"part {i} of {len(chunks)}"))
+        if result_text is None:
+            return (0.5, "LLM evaluation skipped (no API key)", "")
+        scored.append((count_tokens(chunk), parse_response(check, result_text)))
+
+    return merge_chunks(scored)
+
+
+def evaluate_readme_quality(readme_content: str) -> Tuple[float, str, str]:
+    """Use LLM to evaluate README quality"""
+
+    if not readme_content or len(readme_content) < 50:
+        return (0.0, "README is too short or empty", "")
+
+    try:
+        chunks = split_chunks(readme_content, README_TOKEN_BUDGET, 'markdown')
+        if len(chunks) > 1:
+            return _evaluate_chunks('readme_quality', chunks, readme_prompt)
+
+        result_text = _chat_json('readme_quality', readme_prompt(readme_content))
+        if result_text is None:
+            return (0.5, "LLM evaluation skipped (no API key)", "")
+
+        return parse_response('readme_quality', result_text)
+
+    except Exception as e:
+        print(f"  ⚠ LLM README evaluation error: {e}")
+        return (0.5, f"LLM evaluation error: {str(e)}", "")
+
+
+def evaluate_code_quality(code_content: str, language: str = 'javascript') -> Tuple[float, str, str]:
+    """Use LLM to evaluate code quality"""
+
+    if not code_content or len(code_content) < 50:
+        return (0.0, "Code is too short or empty", "")
+
+    try:
+        chunks = split_chunks(code_content, CODE_TOKEN_BUDGET, 'html')
+        if len(chunks) > 1:
+            return _evaluate_chunks('code_quality', chunks,
+                                    lambda chunk, part: code_prompt(chunk, language, part))
+
+        result_text = _chat_json('code_quality', code_prompt(code_content, language))
+        if result_text is None:
+            return (0.5, "LLM evaluation skipped (no API key)", "")
+
+        return parse_response('code_quality', result_text)
+
     except Exception as e:
         print(f"  ⚠ LLM code evaluation error: {e}")
         return (0.5, f"LLM evaluation error: {str(e)}", "")
@@ -122,48 +223,192 @@ Respond ONLY with a JSON object in this format:
 
 def check_code_completeness(code_content: str, brief: str) -> Tuple[float, str, str]:
     """Check if code implements the requirements from the brief"""
-    
+
     try:
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+        result_text = _chat_json('requirements_met', completeness_prompt(code_content, brief))
+        if result_text is None:
             return (0.5, "LLM evaluation skipped (no API key)", "")
-        
-        client = openai.OpenAI(api_key=api_key)
-        
-        prompt = f"""Does this code implementation meet the requirements specified in the brief?
 
-Brief Requirements:
-{brief}
+        return parse_response('requirements_met', result_text)
 
-Code Implementation:
-{code_content[:3000]}
+    except Exception as e:
+        print(f"  ⚠ LLM completeness check error: {e}")
+        return (0.5, f"LLM evaluation error: {str(e)}", "")
+
+
+def combined_prompt(readme_content: str, code_content: str, brief: str,
+                    language: str = 'html') -> Tuple[List[str], Dict, Optional[str]]:
+    """
+    Prompt scoring every applicable rubric item at once
+
+    Returns (wanted checks, results decided without the LLM, prompt); the
+    prompt is None when there is nothing left to ask.
+    """
+    results = {}
+    wanted = []
+
+    if readme_content:
+        if len(readme_content) < 50:
+            results['readme_quality'] = (0.0, "README is too short or empty", "")
+        else:
+            wanted.append('readme_quality')
+
+    if code_content:
+        if len(code_content) < 50:
+            results['code_quality'] = (0.0, "Code is too short or empty", "")
+        else:
+            wanted.append('code_quality')
+        wanted.append('requirements_met')
+
+    if not wanted:
+        return wanted, results, None
+
+    rubric = {
+        'readme_quality': "readme_quality: the README.md documentation - clarity and completeness, "
+                          "professional presentation, proper structure (overview, setup, usage, etc.), "
+                          "code examples and explanations, grammar and formatting",
+        'code_quality': f"code_quality: the {language} code - structure and organization, best practices "
+                        "and modern patterns, error handling, comments and documentation, security "
+                        "considerations, performance",
+        'requirements_met': "requirements_met: whether the code implements the brief - 1.0 if all "
+                            "requirements are met, lower if features are missing",
+    }
+
+    # README, brief and code are each sent once for all rubric items
+    parts = []
+    if 'readme_quality' in wanted:
+        parts.append(f"README Content:\n{fit_to_budget(readme_content, README_TOKEN_BUDGET, 'markdown')}")
+    if code_content:
+        parts.append(f"Brief Requirements:\n{brief}")
+        parts.append(f"Code Content:\n{fit_to_budget(code_content, CODE_TOKEN_BUDGET, 'html', context=brief)}")
+    criteria = "\n".join(f"- {rubric[check]}" for check in wanted)
+    content = "\n\n".join(parts)
+    example = ", ".join(f'"{check}": {{"score": 0.8, "reason": "..."}}' for check in wanted)
+
+    prompt = f"""Evaluate this student web application project.
+
+Rate each item on a scale of 0.0 to 1.0:
+{criteria}
+
+{content}
 
 Respond ONLY with a JSON object in this format:
-{{"score": 0.9, "reason": "Implements all core requirements but missing optional error messages"}}
+{{{example}}}"""
 
-Score should be 1.0 if all requirements are met, lower if missing features."""
+    return wanted, results, prompt
+
+
+def parse_combined(wanted: List[str], result_text: str) -> Dict[str, Tuple[float, str, str]]:
+    """Split a combined JSON answer into one (score, reason, logs) per check"""
+    parsed = json.loads(result_text)
+    results = {}
+
+    for check in wanted:
+        item = parsed.get(check)
+        if not isinstance(item, dict):
+            results[check] = (0.5, f"LLM evaluation error: no {check} in response", result_text)
+            continue
+        results[check] = (float(item.get('score', 0.5)),
+                          item.get('reason', 'LLM evaluation completed'),
+                          json.dumps(item))
+
+    return results
+
+
+def evaluate_combined(readme_content: str, code_content: str, brief: str,
+                      language: str = 'html') -> Dict[str, Tuple[float, str, str]]:
+    """
+    Score README quality, code quality and requirements in one LLM call
+
+    Returns {check: (score, reason, logs)} for the same checks, and with the
+    same short-content rules, as the three separate functions.
+    """
+    wanted, results, prompt = combined_prompt(readme_content, code_content, brief, language)
+    if prompt is None:
+        return results
+
+    try:
+        result_text = _chat_json('combined', prompt)
+        if result_text is None:
+            for check in wanted:
+                results[check] = (0.5, "LLM evaluation skipped (no API key)", "")
+            return results
+
+        results.update(parse_combined(wanted, result_text))
 
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a requirements verification expert. Respond only with JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=200
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        import json
-        result = json.loads(result_text)
-        
-        score = float(result.get('score', 0.5))
-        reason = result.get('reason', 'Requirements check completed')
-        
-        return (score, reason, result_text)
-        
     except Exception as e:
-        print(f"  ⚠ LLM completeness check error: {e}")
-        return (0.5, f"LLM evaluation error: {str(e)}", "")
+        print(f"  ⚠ LLM combined evaluation error: {e}")
+        for check in wanted:
+            results[check] = (0.5, f"LLM evaluation error: {str(e)}", "")
+
+    return results
+
+
+def plan_requests(readme_content: str, code_content: str, brief: str, mode: str = 'separate',
+                  language: str = 'html') -> Tuple[Dict, List[Dict]]:
+    """
+    The LLM requests evaluate.py would make for one repo, without sending them
+
+    Returns (results decided without the LLM, requests); each request has
+    check, wanted (the checks its answer scores) and request parameters.
+    Used to prepare offline batches.
+    """
+    if mode == 'combined':
+        wanted, results, prompt = combined_prompt(readme_content, code_content, brief, language)
+        requests = []
+        if prompt is not None:
+            requests.append({'check': 'combined', 'wanted': wanted,
+                             'request': build_request('combined', prompt)})
+        return results, requests
+
+    results = {}
+    requests = []
+
+    if readme_content:
+        if len(readme_content) < 50:
+            results['readme_quality'] = (0.0, "README is too short or empty", "")
+        else:
+            chunks = split_chunks(readme_content, README_TOKEN_BUDGET, 'markdown')
+            requests.extend(_chunk_requests('readme_quality', readme_content, chunks, readme_prompt))
+
+    if code_content:
+        if len(code_content) < 50:
+            results['code_quality'] = (0.0, "Code is too short or empty", "")
+        else:
+            chunks = split_chunks(code_content, CODE_TOKEN_BUDGET, 'html')
+            requests.extend(_chunk_requests('code_quality', code_content, chunks,
+                                            lambda chunk, part=None: code_prompt(chunk, language, part)))
+        requests.append({'check': 'requirements_met', 'wanted': ['requirements_met'],
+                         'request': build_request('requirements_met', completeness_prompt(code_content, brief))})
+
+    return results, requests
+
+
+def _chunk_requests(check: str, content: str, chunks: List[str], make_prompt) -> List[Dict]:
+    """
+    One request per chunk, with the same prompts as the interactive checks
+
+    A file split into several chunks gets part (index, count) and weight
+    (token count) on each request, for merging the answers with parse_answer.
+    """
+    if len(chunks) <= 1:
+        return [{'check': check, 'wanted': [check], 'request': build_request(check, make_prompt(content))}]
+
+    return [{'check': check, 'wanted': [check], 'part': (i, len(chunks)), 'weight': count_tokens(chunk),
+             'request': build_request(check, make_prompt(chunk, f"part {i + 1} of {len(chunks)}"))}
+            for i, chunk in enumerate(chunks)]
+
+
+def parse_answer(check: str, wanted: List[str], result_text, weights: List[int] = None) -> Dict[str, Tuple[float, str, str]]:
+    """
+    Results for a planned request's answer
+
+    For a file split into parts, pass every part's answer in order as a
+    list along with the parts' weights; they are merged as in interactive mode.
+    """
+    if check == 'combined':
+        return parse_combined(wanted, result_text)
+    if weights is not None:
+        return {check: merge_chunks([(weight, parse_response(check, text))
+                                     for weight, text in zip(weights, result_text)])}
+    return {check: parse_response(check, result_text)}
@@ -0,0 +1,167 @@
+"""
+Shared LLM client: Rate-limited, retrying OpenAI calls on one event loop
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import openai
+from dotenv import load_dotenv
+
+from background_loop import BackgroundLoop
+
+load_dotenv()
+
+# Budgets for the account's rate-limit tier; requests wait for both
+LLM_RPM = int(os.getenv('LLM_RPM', 500))
+LLM_TPM = int(os.getenv('LLM_TPM', 160000))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 5))
+LLM_TIMEOUT = 60
+
+# Rough token count when the real one is unknown (about 4 characters per token)
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` units per minute up to `capacity`
+
+    acquire() waits until enough units are available. Amounts larger than
+    the capacity are clamped so a single big request can still proceed.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = None
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` units now; returns seconds to wait before using them"""
+        amount = min(amount, self.capacity)
+        self._refill()
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, delta: float):
+        """Correct a reservation once the real usage is known"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    async def acquire(self, amount: float = 1):
+        # Reservations are made under the lock so concurrent callers queue
+        # behind each other instead of all waking up at once
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    return sum(len(m['content']) for m in messages) // CHARS_PER_TOKEN + max_tokens
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying, or None if the error is not retryable"""
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code != 429 and error.status_code < 500:
+            return None
+        retry_after = error.response.headers.get('retry-after')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    elif not isinstance(error, openai.APIConnectionError):
+        return None
+    return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+class LLMClient:
+    """
+    One AsyncOpenAI client shared by every LLM check
+
+    Calls wait for both the requests-per-minute and tokens-per-minute
+    buckets, run at most `max_concurrency` at a time, and retry 429, 5xx
+    and connection errors with exponential backoff (honouring Retry-After).
+    """
+
+    def __init__(self, api_key: str, rpm: int = LLM_RPM, tpm: int = LLM_TPM,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_retries: int = LLM_MAX_RETRIES):
+        self.client = openai.AsyncOpenAI(api_key=api_key, max_retries=0, timeout=LLM_TIMEOUT)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._semaphore = None
+
+    async def chat(self, model: str, messages: List[Dict], temperature: float = 0.3,
+                   max_tokens: int = 200, **kwargs) -> str:
+        """Response text of one chat completion"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        estimate = _estimate_tokens(messages, max_tokens)
+
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimate)
+            try:
+                async with self._semaphore:
+                    response = await self.client.chat.completions.create(
+                        model=model, messages=messages, temperature=temperature,
+                        max_tokens=max_tokens, **kwargs
+                    )
+            except openai.OpenAIError as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    raise
+                print(f"  ⊘ LLM request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.usage is not None:
+                self.tokens.adjust(response.usage.total_tokens - estimate)
+            return response.choices[0].message.content.strip()
+
+
+_loop = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_llm_client(api_key: str) -> LLMClient:
+    """Process-wide client for this API key"""
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = LLMClient(api_key)
+    return client
+
+
+def chat(api_key: str, model: str, messages: List[Dict], **kwargs) -> str:
+    """
+    Blocking wrapper for threads
+
+    Every call runs on one background event loop so the buckets, semaphore
+    and HTTP connection pool are shared by all worker threads.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = BackgroundLoop('llm-client')
+    return _loop.run(get_llm_client(api_key).chat(model, messages, **kwargs))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Repo metadata: GitHub repository details cached in the database
+"""
+
+import sys
+import os
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+from sqlalchemy.exc import IntegrityError
+
+from db_models import get_session, RepoMetadata, Repo
+from github_client import github_get, github_post, get_client
+
+
+# Cached rows older than this are revalidated with a conditional request
+METADATA_MAX_AGE = int(os.getenv('REPO_METADATA_MAX_AGE', 86400))
+# Repos GitHub reported missing (404) are not asked about again for this long
+METADATA_NEGATIVE_TTL = int(os.getenv('REPO_METADATA_NEGATIVE_TTL', 3600))
+GRAPHQL_BATCH_SIZE = 50
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+
+def repo_key(repo_url: str) -> str:
+    """owner/name for a GitHub URL, lowercased"""
+    parts = repo_url.rstrip('/').replace('https://github.com/', '').split('/')
+    name = parts[1][:-4] if parts[1].endswith('.git') else parts[1]
+    return f"{parts[0]}/{name}".lower()
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    """GitHub ISO timestamp as naive UTC, matching the rest of the schema"""
+    if not value:
+        return None
+    from dateutil import parser
+    parsed = parser.parse(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _as_dict(row: RepoMetadata) -> Dict:
+    """Row as a dict; created_at is None for a repo cached as missing"""
+    return {
+        'repo': row.repo,
+        'created_at': row.created_at,
+        'default_branch': row.default_branch,
+        'pages_status': row.pages_status,
+        'fetched_at': row.fetched_at
+    }
+
+
+def _is_fresh(row: RepoMetadata, max_age: int) -> bool:
+    if row.created_at is None:
+        max_age = min(max_age, METADATA_NEGATIVE_TTL)
+    return (datetime.utcnow() - row.fetched_at).total_seconds() < max_age
+
+
+def fetch_repo_metadata(session, repo_url: str, max_age: int = METADATA_MAX_AGE) -> Optional[Dict]:
+    """
+    Metadata for one repo, from the database when fresh
+
+    Stale rows are revalidated with If-None-Match; a 304 only bumps
+    fetched_at. A 404 is cached for METADATA_NEGATIVE_TTL as a row without
+    created_at. Returns None only when GitHub could not answer and nothing
+    usable is cached; a stale row is returned instead when there is one.
+    """
+    key = repo_key(repo_url)
+    row = session.query(RepoMetadata).filter_by(repo=key).first()
+    if row is not None and _is_fresh(row, max_age):
+        return _as_dict(row)
+
+    headers = {'If-None-Match': row.etag} if row is not None and row.etag else {}
+    try:
+        response = github_get(f"https://api.github.com/repos/{key}", headers=headers)
+    except requests.RequestException:
+        return _as_dict(row) if row is not None and row.created_at else None
+
+    if response.status_code == 304 and row is not None:
+        row.fetched_at = datetime.utcnow()
+        session.commit()
+        return _as_dict(row)
+
+    if response.status_code not in (200, 404):
+        return _as_dict(row) if row is not None and row.created_at else None
+
+    data = response.json() if response.status_code == 200 else {}
+    if row is None:
+        row = RepoMetadata(repo=key)
+        session.add(row)
+    row.created_at = _parse_time(data.get('created_at'))
+    row.default_branch = data.get('default_branch')
+    row.pages_status = ('enabled' if data.get('has_pages') else 'disabled') if data else None
+    row.etag = response.headers.get('ETag') if data else None
+    row.fetched_at = datetime.utcnow()
+
+    try:
+        session.commit()
+    except IntegrityError:
+        # Another worker stored the same repo first
+        session.rollback()
+        row = session.query(RepoMetadata).filter_by(repo=key).first()
+
+    return _as_dict(row)
+
+
+def get_repo_metadata(repo_url: str, max_age: int = METADATA_MAX_AGE) -> Optional[Dict]:
+    """fetch_repo_metadata on a short-lived session, safe to call from worker threads"""
+    session = get_session()
+    try:
+        return fetch_repo_metadata(session, repo_url, max_age)
+    finally:
+        session.close()
+
+
+def _graphql_query(keys) -> str:
+    fields = []
+    for i, key in enumerate(keys):
+        owner, name = key.split('/', 1)
+        fields.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) "
+                      "{ createdAt defaultBranchRef { name } }")
+    return "query { " + " ".join(fields) + " }"
+
+
+def prefetch_metadata(session, repo_urls: Iterable[str], batch_size: int = GRAPHQL_BATCH_SIZE,
+                      max_age: int = METADATA_MAX_AGE) -> int:
+    """
+    Load metadata for many repos through the GraphQL API, batch_size per request
+
+    Only repos without a fresh row are requested. GraphQL does not expose
+    Pages status, so that column is left as is. Returns the rows stored.
+    """
+    if not get_client().token:
+        print("⊘ GITHUB_TOKEN not set, GraphQL prefetch skipped")
+        return 0
+
+    rows = {row.repo: row for row in session.query(RepoMetadata).all()}
+    keys = sorted({repo_key(url) for url in repo_urls})
+    keys = [key for key in keys if key not in rows or not _is_fresh(rows[key], max_age)]
+
+    stored = 0
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        response = github_post(GRAPHQL_URL, json={'query': _graphql_query(batch)}, timeout=30)
+        if response.status_code != 200:
+            print(f"✗ GraphQL prefetch failed: HTTP {response.status_code}")
+            continue
+
+        # Missing or private repos come back as null with an entry in "errors"
+        data = response.json().get('data') or {}
+        for i, key in enumerate(batch):
+            repository = data.get(f'r{i}')
+            if not repository:
+                continue
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = RepoMetadata(repo=key)
+                session.add(row)
+            row.created_at = _parse_time(repository.get('createdAt'))
+            row.default_branch = (repository.get('defaultBranchRef') or {}).get('name')
+            row.fetched_at = datetime.utcnow()
+            stored += 1
+        session.commit()
+
+        print(f"  → Prefetched {min(start + batch_size, len(keys))}/{len(keys)} repos")
+
+    return stored
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prefetch GitHub metadata for submitted repos')
+    parser.add_argument('--batch-size', type=int, default=GRAPHQL_BATCH_SIZE,
+                       help='Repositories per GraphQL request')
+    parser.add_argument('--max-age', type=int, default=METADATA_MAX_AGE,
+                       help='Seconds before cached metadata is fetched again')
+
+    args = parser.parse_args()
+
+    session = get_session()
+    urls = [url for (url,) in session.query(Repo.repo_url).distinct()]
+    stored = prefetch_metadata(session, urls, args.batch_size, args.max_age)
+    print(f"✓ Stored metadata for {stored} of {len(urls)} repositories")
@@ -0,0 +1,226 @@
+"""
+Repo snapshots: One archive download per (repo, commit) for static checks
+"""
+
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from github_client import github_get
+
+
+SNAPSHOT_DIR = os.path.expanduser(os.getenv('SNAPSHOT_DIR', '~/.cache/llm-deployment/snapshots'))
+SNAPSHOT_MAX_MB = int(os.getenv('SNAPSHOT_MAX_MB', 100))
+SNAPSHOT_TIMEOUT = 30
+# Extracted trees kept for re-evaluations of the same commit; least
+# recently used ones are removed once they take up more than this
+SNAPSHOT_CACHE_MB = int(os.getenv('SNAPSHOT_CACHE_MB', 1024))
+
+# Only full commit SHAs are cached: a branch name or short SHA can point
+# at different trees over time
+_FULL_SHA = re.compile(r'^[0-9a-f]{40}$')
+
+# Cached trees currently open, which pruning must not remove
+_in_use = {}
+_in_use_lock = threading.Lock()
+
+
+class RepoSnapshot:
+    """Files of one repository at one commit, extracted on local disk"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, file_path: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, file_path))
+        if not path.startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(f"Path escapes snapshot: {file_path}")
+        return path
+
+    def exists(self, file_path: str) -> bool:
+        return os.path.isfile(self._path(file_path))
+
+    def read(self, file_path: str) -> Optional[str]:
+        """File text, or None when the file does not exist"""
+        try:
+            # Bytes, not text mode, so line endings match a raw GitHub fetch
+            with open(self._path(file_path), 'rb') as f:
+                return f.read().decode('utf-8', errors='replace')
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def files(self) -> List[str]:
+        """Every file in the tree as a relative path, .git excluded"""
+        paths = []
+        for root, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d != '.git']
+            for name in names:
+                paths.append(os.path.relpath(os.path.join(root, name), self.root))
+        return sorted(paths)
+
+
+def _archive_url(repo_url: str, commit_sha: str) -> str:
+    owner_repo = '/'.join(repo_url.rstrip('/').replace('https://github.com/', '').split('/')[:2])
+    return f"https://codeload.github.com/{owner_repo}/tar.gz/{commit_sha}"
+
+
+def _download(url: str, dest) -> bool:
+    limit = SNAPSHOT_MAX_MB * 1024 * 1024
+    with github_get(url, stream=True, timeout=SNAPSHOT_TIMEOUT) as response:
+        if response.status_code != 200:
+            return False
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > limit:
+                raise ValueError(f"Archive larger than {SNAPSHOT_MAX_MB} MB")
+            dest.write(chunk)
+    return True
+
+
+def _extract(tar: tarfile.TarFile, dest: str):
+    """Extract a GitHub tarball, dropping its single top-level directory"""
+    members = []
+    for member in tar.getmembers():
+        parts = member.name.split('/', 1)
+        if len(parts) < 2 or not parts[1]:
+            continue
+        member.name = parts[1]
+        members.append(member)
+    tar.extractall(dest, members=members, filter='data')
+
+
+def fetch_snapshot(repo_url: str, commit_sha: str, workspace: str = None) -> Optional[RepoSnapshot]:
+    """
+    Download and extract the repo at commit_sha into a fresh directory
+
+    Returns None if the archive is unavailable; callers fall back to
+    per-file fetches.
+    """
+    workspace = workspace or SNAPSHOT_DIR
+    os.makedirs(workspace, exist_ok=True)
+    root = tempfile.mkdtemp(prefix='snapshot-', dir=workspace)
+
+    try:
+        with tempfile.TemporaryFile(dir=workspace) as archive:
+            if not _download(_archive_url(repo_url, commit_sha), archive):
+                shutil.rmtree(root, ignore_errors=True)
+                return None
+            archive.seek(0)
+            with tarfile.open(fileobj=archive, mode='r:gz') as tar:
+                _extract(tar, root)
+    except Exception:
+        shutil.rmtree(root, ignore_errors=True)
+        raise
+
+    return RepoSnapshot(root)
+
+
+def _cache_dir(workspace: str) -> str:
+    return os.path.join(workspace, 'trees')
+
+
+def cached_snapshot(repo_url: str, commit_sha: str, workspace: str = None) -> Optional[RepoSnapshot]:
+    """
+    Snapshot of a full commit SHA, extracted once and reused afterwards
+
+    The tree is extracted to a temporary directory and renamed into place,
+    so a half-extracted tree is never reused.
+    """
+    workspace = workspace or SNAPSHOT_DIR
+    cache_dir = _cache_dir(workspace)
+    root = os.path.join(cache_dir, commit_sha)
+
+    if not os.path.isdir(root):
+        os.makedirs(cache_dir, exist_ok=True)
+        snapshot = fetch_snapshot(repo_url, commit_sha, cache_dir)
+        if snapshot is None:
+            return None
+        try:
+            os.rename(snapshot.root, root)
+        except OSError:
+            # Another worker cached the same commit first
+            shutil.rmtree(snapshot.root, ignore_errors=True)
+            if not os.path.isdir(root):
+                raise
+
+    # The directory's mtime is its last use for pruning
+    os.utime(root)
+    return RepoSnapshot(root)
+
+
+def _dir_size(path: str) -> int:
+    size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
+
+
+def prune_snapshots(workspace: str = None, max_bytes: int = SNAPSHOT_CACHE_MB * 1024 * 1024) -> int:
+    """Remove least recently used cached trees until the rest fit in max_bytes; returns the number removed"""
+    cache_dir = _cache_dir(workspace or SNAPSHOT_DIR)
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    trees = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if _FULL_SHA.match(name) and os.path.isdir(path):
+            trees.append((os.path.getmtime(path), _dir_size(path), path))
+
+    total = sum(size for _, size, _ in trees)
+    removed = 0
+    for _, size, path in sorted(trees):
+        if total <= max_bytes:
+            break
+        with _in_use_lock:
+            if _in_use.get(path):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+@contextmanager
+def open_snapshot(repo_url: str, commit_sha: str, workspace: str = None) -> Iterator[Optional[RepoSnapshot]]:
+    """
+    Snapshot for the duration of a with-block
+
+    Trees of full commit SHAs stay cached under SNAPSHOT_DIR for the next
+    evaluation of the same commit; anything else is removed afterwards.
+    Yields None when the snapshot could not be fetched.
+    """
+    cached = bool(_FULL_SHA.match(commit_sha or ''))
+    try:
+        if cached:
+            with _in_use_lock:
+                root = os.path.join(_cache_dir(workspace or SNAPSHOT_DIR), commit_sha)
+                _in_use[root] = _in_use.get(root, 0) + 1
+            snapshot = cached_snapshot(repo_url, commit_sha, workspace)
+        else:
+            snapshot = fetch_snapshot(repo_url, commit_sha, workspace)
+    except Exception as e:
+        print(f"  ⊘ Snapshot unavailable for {repo_url}@{commit_sha}: {e}")
+        snapshot = None
+
+    try:
+        yield snapshot
+    finally:
+        if cached:
+            with _in_use_lock:
+                _in_use[root] -= 1
+                if not _in_use[root]:
+                    del _in_use[root]
+            prune_snapshots(workspace)
+        elif snapshot is not None:
+            shutil.rmtree(snapshot.root, ignore_errors=True)
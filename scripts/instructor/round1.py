@@ -9,17 +9,50 @@ import csv
 import requests
 import uuid
 from datetime import datetime
+from typing import Dict
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from db_models import get_session, Task
+from db_models import get_session, Task, Delivery
+from delivery_queue import enqueue_delivery
 from task_generator import TaskGenerator
+from dispatcher import run_dispatch, DEFAULT_PER_HOST, DEFAULT_TIMEOUT
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Concurrent deliveries are committed in batches of this many results
+RECORD_BATCH_SIZE = 50
 
-def send_round1_tasks(submissions_csv: str, templates_path: str):
+
+def _record_task(session, delivery: Dict, status_code: int, error: str = '', commit: bool = True):
+    """Log a delivery attempt to the tasks table, queueing it for retry if it failed"""
+    task_data = delivery['task_data']
+    task = Task(
+        email=delivery['email'],
+        task=task_data.get('task_id', 'unknown'),
+        round=1,
+        nonce=delivery['nonce'],
+        brief=task_data.get('brief', ''),
+        attachments=task_data.get('attachments', []),
+        checks=task_data.get('checks', []),
+        evaluation_url=delivery['payload']['evaluation_url'],
+        endpoint=delivery['endpoint'],
+        statuscode=status_code,
+        secret=delivery['payload']['secret']
+    )
+    session.add(task)
+    
+    if status_code != 200:
+        enqueue_delivery(session, delivery['email'], task.task, 1, delivery['nonce'],
+                         delivery['endpoint'], delivery['payload'], status_code, error)
+    
+    if commit:
+        session.commit()
+
+
+def send_round1_tasks(submissions_csv: str, templates_path: str, concurrency: int = 1,
+                      per_host: int = DEFAULT_PER_HOST, timeout: float = DEFAULT_TIMEOUT):
     """Send Round 1 tasks to all students"""
     
     session = get_session()
@@ -37,6 +70,22 @@ def send_round1_tasks(submissions_csv: str, templates_path: str):
     
     print(f"\nProcessing {len(submissions)} submissions...\n")
     
+    # Students who already received Round 1 successfully or are awaiting retry
+    already_sent = {
+        email for (email,) in session.query(Task.email).filter(
+            Task.round == 1,
+            Task.statuscode == 200
+        )
+    }
+    queued = {
+        email for (email,) in session.query(Delivery.email).filter(
+            Delivery.round == 1,
+            Delivery.status == 'pending'
+        )
+    }
+    
+    deliveries = []
+    
     for i, submission in enumerate(submissions, 1):
         email = submission['email']
         endpoint = submission['endpoint']
@@ -44,86 +93,93 @@ def send_round1_tasks(submissions_csv: str, templates_path: str):
         
         print(f"[{i}/{len(submissions)}] Processing {email}")
         
-        # Check if already sent Round 1
-        existing = session.query(Task).filter_by(
-            email=email,
-            round=1
-        ).filter(Task.statuscode == 200).first()
-        
-        if existing:
+        if email in already_sent:
             print(f"  ⊘ Skipping - Round 1 already sent successfully")
             continue
         
+        if email in queued:
+            print(f"  ⊘ Skipping - Round 1 delivery queued for retry")
+            continue
+        
+        # Pick a random template (or cycle through them)
+        template_id = template_ids[i % len(template_ids)]
+        
+        # Generate task
         try:
-            # Pick a random template (or cycle through them)
-            template_id = template_ids[i % len(template_ids)]
-            
-            # Generate task
             task_data = generator.generate_task(template_id, email, round_num=1)
-            nonce = str(uuid.uuid4())
-            
-            # Build request payload
-            payload = {
-                'email': email,
-                'secret': secret,
-                'task': task_data['task_id'],
-                'round': 1,
-                'nonce': nonce,
-                'brief': task_data['brief'],
-                'checks': task_data['checks'],
-                'evaluation_url': evaluation_url,
-                'attachments': task_data['attachments']
-            }
-            
-            print(f"  → Task: {task_data['task_id']}")
-            print(f"  → Endpoint: {endpoint}")
-            
-            # Send POST request
-            response = requests.post(
-                endpoint,
-                json=payload,
-                timeout=30
-            )
-            
-            status_code = response.status_code
-            print(f"  ✓ Response: HTTP {status_code}")
-            
-            # Log to database
-            task = Task(
-                email=email,
-                task=task_data['task_id'],
-                round=1,
-                nonce=nonce,
-                brief=task_data['brief'],
-                attachments=task_data['attachments'],
-                checks=task_data['checks'],
-                evaluation_url=evaluation_url,
-                endpoint=endpoint,
-                statuscode=status_code,
-                secret=secret
-            )
-            session.add(task)
-            session.commit()
-            
         except Exception as e:
-            print(f"  ✗ Error: {e}")
-            
-            # Log failed attempt
-            task = Task(
-                email=email,
-                task=task_data.get('task_id', 'unknown'),
-                round=1,
-                nonce=nonce,
-                brief=task_data.get('brief', ''),
-                attachments=task_data.get('attachments', []),
-                checks=task_data.get('checks', []),
-                evaluation_url=evaluation_url,
-                endpoint=endpoint,
-                statuscode=0,
-                secret=secret
-            )
-            session.add(task)
+            print(f"  ✗ Error generating task: {e}")
+            continue
+        nonce = str(uuid.uuid4())
+        
+        # Build request payload
+        payload = {
+            'email': email,
+            'secret': secret,
+            'task': task_data['task_id'],
+            'round': 1,
+            'nonce': nonce,
+            'brief': task_data['brief'],
+            'checks': task_data['checks'],
+            'evaluation_url': evaluation_url,
+            'attachments': task_data['attachments']
+        }
+        
+        print(f"  → Task: {task_data['task_id']}")
+        print(f"  → Endpoint: {endpoint}")
+        
+        deliveries.append({
+            'email': email,
+            'endpoint': endpoint,
+            'nonce': nonce,
+            'task_data': task_data,
+            'payload': payload
+        })
+    
+    if concurrency > 1:
+        print(f"\nDispatching {len(deliveries)} tasks "
+              f"(concurrency {concurrency}, {per_host} per host)...\n")
+        
+        recorded = 0
+        
+        def on_result(result):
+            nonlocal recorded
+            if result['error']:
+                print(f"  ✗ {result['email']}: {result['error']}")
+            else:
+                print(f"  ✓ {result['email']}: HTTP {result['status_code']}")
+            # on_result runs on the event loop; a commit per result would
+            # stall every in-flight delivery, so commit in batches
+            _record_task(session, result, result['status_code'], result['error'] or '', commit=False)
+            recorded += 1
+            if recorded % RECORD_BATCH_SIZE == 0:
+                session.commit()
+        
+        try:
+            run_dispatch(deliveries, on_result, concurrency=concurrency,
+                         per_host=per_host, timeout=timeout)
+        finally:
             session.commit()
+    else:
+        for delivery in deliveries:
+            print(f"  → Sending to {delivery['email']}")
+            try:
+                # Send POST request
+                response = requests.post(
+                    delivery['endpoint'],
+                    json=delivery['payload'],
+                    timeout=timeout
+                )
+                status_code = response.status_code
+                print(f"  ✓ Response: HTTP {status_code}")
+                error = ''
+            except Exception as e:
+                print(f"  ✗ Error: {e}")
+                status_code = 0
+                error = str(e)
+            
+            # Log to database
+            _record_task(session, delivery, status_code, error)
     
     print("\n=== Round 1 Complete ===")
     
@@ -135,6 +191,9 @@ def send_round1_tasks(submissions_csv: str, templates_path: str):
     print(f"Total sent: {total}")
     print(f"Successful: {successful}")
     print(f"Failed: {failed}")
+    
+    if failed:
+        print("\nFailed deliveries are queued; run delivery_queue.py to retry them")
 
 
 if __name__ == '__main__':
@@ -145,6 +204,12 @@ if __name__ == '__main__':
                        help='Path to submissions CSV file')
     parser.add_argument('--templates', default='../../config/task_templates.json',
                        help='Path to task templates JSON file')
+    parser.add_argument('--concurrency', type=int, default=1,
+                       help='Number of deliveries in flight (1 = sequential)')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                       help='Maximum deliveries in flight to one host')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                       help='Per-request deadline in seconds')
     
     args = parser.parse_args()
     
@@ -160,4 +225,5 @@ if __name__ == '__main__':
         print(f"Error: Templates file not found: {templates_path}")
         sys.exit(1)
     
-    send_round1_tasks(args.submissions, templates_path)
+    send_round1_tasks(args.submissions, templates_path, concurrency=args.concurrency,
+                      per_host=args.per_host, timeout=args.timeout)
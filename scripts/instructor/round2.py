@@ -12,6 +12,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from db_models import get_session, Task, Repo
+from delivery_queue import enqueue_delivery
 from task_generator import TaskGenerator
 from dotenv import load_dotenv
 
@@ -44,6 +45,11 @@ def send_round2_tasks(templates_path: str):
             print(f"  ⊘ Skipping - Round 2 already sent")
             continue
         
+        task_data = None
+        round1_task = None
+        nonce = None
+        payload = None
+        
         try:
             # Get original Round 1 task
             round1_task = session.query(Task).filter_by(
@@ -113,10 +119,37 @@ def send_round2_tasks(templates_path: str):
                 secret=round1_task.secret
             )
             session.add(task)
+            
+            if status_code != 200:
+                enqueue_delivery(session, email, task.task, 2, nonce,
+                                 round1_task.endpoint, payload, status_code)
+            
             session.commit()
             
         except Exception as e:
             print(f"  ✗ Error: {e}")
+            session.rollback()
+            
+            # Log failed delivery and queue it for retry; without a payload
+            # there is nothing to redeliver
+            if payload is not None:
+                task = Task(
+                    email=email,
+                    task=task_data['task_id'],
+                    round=2,
+                    nonce=nonce,
+                    brief=task_data['brief'],
+                    attachments=task_data['attachments'],
+                    checks=task_data['checks'],
+                    evaluation_url=evaluation_url,
+                    endpoint=round1_task.endpoint,
+                    statuscode=0,
+                    secret=round1_task.secret
+                )
+                session.add(task)
+                enqueue_delivery(session, email, task.task, 2, nonce,
+                                 round1_task.endpoint, payload, 0, str(e))
+                session.commit()
     
     print("\n=== Round 2 Complete ===")
     
@@ -128,6 +161,9 @@ def send_round2_tasks(templates_path: str):
     print(f"Total sent: {total}")
     print(f"Successful: {successful}")
     print(f"Failed: {failed}")
+    
+    if failed:
+        print("\nFailed deliveries are queued; run delivery_queue.py to retry them")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,346 @@
+"""
+Secret scanner: Stream every blob in a repo's history through one matcher
+"""
+
+import hashlib
+import math
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from repo_snapshot import RepoSnapshot, SNAPSHOT_DIR
+
+
+# Known token formats; compiled into a single alternation so each blob is
+# searched once regardless of how many patterns there are
+SECRET_PATTERNS = {
+    'AWS access key': r'\b(?:AKIA|ASIA)[0-9A-Z]{16}\b',
+    'GitHub token': r'\bgh[pousr]_[A-Za-z0-9]{36,}\b',
+    'GitHub fine-grained token': r'\bgithub_pat_[A-Za-z0-9_]{60,}\b',
+    'OpenAI API key': r'\bsk-(?:proj-)?[A-Za-z0-9_-]{32,}',
+    'Anthropic API key': r'\bsk-ant-[A-Za-z0-9_-]{32,}',
+    'Google API key': r'\bAIza[0-9A-Za-z_-]{35}\b',
+    'Slack token': r'\bxox[abposr]-[A-Za-z0-9-]{10,}',
+    'Stripe secret key': r'\b[rs]k_live_[A-Za-z0-9]{20,}\b',
+    'Private key': r'-----BEGIN (?:RSA |EC |OPENSSH |DSA |PGP )?PRIVATE KEY(?: BLOCK)?-----',
+}
+
+# Values assigned to secret-looking names, kept only if they look random
+ASSIGNMENT_PATTERN = (r'(?i:api[_-]?key|secret|token|passw(?:or)?d|access[_-]?key)'
+                      r'[\w-]*["\']?\s*[:=]\s*["\']([A-Za-z0-9+/_.=-]{20,})["\']')
+ENTROPY_THRESHOLD = 4.0
+
+MAX_BLOB_BYTES = 1024 * 1024
+MAX_FINDINGS = 50
+CLONE_TIMEOUT = 120
+
+# Bare clones kept between evaluations, so re-scanning a repo only fetches
+# commits pushed since the last scan; least recently used ones are removed
+# once they take up more than HISTORY_MAX_MB
+HISTORY_DIR = os.path.expanduser(os.getenv('HISTORY_DIR', os.path.join(SNAPSHOT_DIR, 'history')))
+HISTORY_MAX_MB = int(os.getenv('HISTORY_MAX_MB', 2048))
+# Only branches: refs/pull/* on GitHub holds other people's commits
+BRANCH_REFSPEC = '+refs/heads/*:refs/heads/*'
+
+_names = list(SECRET_PATTERNS)
+_KNOWN = '|'.join(f'(?P<p{i}>{SECRET_PATTERNS[name]})' for i, name in enumerate(_names))
+_MATCHER = re.compile(f'{_KNOWN}|(?P<assign>{ASSIGNMENT_PATTERN})')
+_KNOWN_MATCHER = re.compile(_KNOWN)
+_ASSIGNMENT = re.compile(ASSIGNMENT_PATTERN)
+
+
+def shannon_entropy(value: str) -> float:
+    """Bits of entropy per character"""
+    if not value:
+        return 0.0
+    counts = {}
+    for char in value:
+        counts[char] = counts.get(char, 0) + 1
+    return -sum(n / len(value) * math.log2(n / len(value)) for n in counts.values())
+
+
+def scan_text(text: str) -> List[Tuple[str, int]]:
+    """Return (kind, line number) for each secret found in text"""
+    findings = []
+    for match in _MATCHER.finditer(text):
+        kind = None
+        if match.lastgroup == 'assign':
+            # An assignment match swallows its value, so known formats
+            # inside it are checked before falling back to entropy
+            value = _ASSIGNMENT.match(match.group(0)).group(1)
+            known = _KNOWN_MATCHER.search(value)
+            if known:
+                kind = _names[int(known.lastgroup[1:])]
+            elif shannon_entropy(value) >= ENTROPY_THRESHOLD:
+                kind = 'High-entropy secret'
+        else:
+            kind = _names[int(match.lastgroup[1:])]
+        if kind:
+            findings.append((kind, text.count('\n', 0, match.start()) + 1))
+    return findings
+
+
+def _decode(data: bytes) -> Optional[str]:
+    """Text of a blob, or None for binary content"""
+    if b'\0' in data[:8000]:
+        return None
+    return data.decode('utf-8', errors='replace')
+
+
+def _git(*args, timeout: float = CLONE_TIMEOUT) -> subprocess.CompletedProcess:
+    env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+    return subprocess.run(['git', *args], check=True, capture_output=True, timeout=timeout, env=env)
+
+
+def clone_repo(repo_url: str, dest: str):
+    """Bare clone of the repo's branches (no working tree, no pull request refs)"""
+    _git('clone', '--bare', '--quiet', repo_url, dest)
+
+
+def _has_commit(git_dir: str, commit_sha: str) -> bool:
+    try:
+        _git('--git-dir', git_dir, 'cat-file', '-e', f'{commit_sha}^{{commit}}', timeout=30)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+_mirror_locks = {}
+_mirror_locks_lock = threading.Lock()
+
+
+def _mirror_lock(path: str) -> threading.Lock:
+    with _mirror_locks_lock:
+        return _mirror_locks.setdefault(path, threading.Lock())
+
+
+def _mirror_path(repo_url: str, workspace: str) -> str:
+    return os.path.join(workspace, hashlib.sha256(repo_url.encode()).hexdigest()[:16] + '.git')
+
+
+def update_mirror(repo_url: str, commit_sha: str = None, workspace: str = None) -> str:
+    """
+    Local bare clone of repo_url, cloned once and fetched on later calls
+
+    Returns the git directory, which holds commit_sha when one is given
+    (fetched directly if no branch contains it any more). The caller must
+    hold _mirror_lock(); the clone goes to a temporary directory and is
+    renamed into place, so an interrupted clone is never reused.
+    """
+    workspace = workspace or HISTORY_DIR
+    os.makedirs(workspace, exist_ok=True)
+    git_dir = _mirror_path(repo_url, workspace)
+
+    if os.path.isdir(git_dir):
+        if commit_sha is None or not _has_commit(git_dir, commit_sha):
+            _git('--git-dir', git_dir, 'fetch', '--quiet', '--prune', repo_url, BRANCH_REFSPEC)
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix='clone-', dir=workspace)
+        try:
+            clone_repo(repo_url, os.path.join(tmp_dir, 'repo.git'))
+            try:
+                os.rename(os.path.join(tmp_dir, 'repo.git'), git_dir)
+            except OSError:
+                # Another process finished the same clone first
+                if not os.path.isdir(git_dir):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if commit_sha is not None and not _has_commit(git_dir, commit_sha):
+        _git('--git-dir', git_dir, 'fetch', '--quiet', repo_url, commit_sha)
+
+    # The directory's mtime is its last use for pruning
+    os.utime(git_dir)
+    return git_dir
+
+
+def _dir_size(path: str) -> int:
+    size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
+
+
+def prune_mirrors(workspace: str = None, max_bytes: int = HISTORY_MAX_MB * 1024 * 1024) -> int:
+    """Remove least recently used clones until the rest fit in max_bytes; returns the number removed"""
+    workspace = workspace or HISTORY_DIR
+    if not os.path.isdir(workspace):
+        return 0
+
+    mirrors = []
+    for name in os.listdir(workspace):
+        path = os.path.join(workspace, name)
+        if name.endswith('.git') and os.path.isdir(path):
+            mirrors.append((os.path.getmtime(path), _dir_size(path), path))
+
+    total = sum(size for _, size, _ in mirrors)
+    removed = 0
+    for _, size, path in sorted(mirrors):
+        if total <= max_bytes:
+            break
+        lock = _mirror_lock(path)
+        # Clones being scanned right now are left alone
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            lock.release()
+        total -= size
+        removed += 1
+    return removed
+
+
+def iter_history_blobs(git_dir: str, commit_sha: str = None) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (commit, path, blob sha) for every blob added or modified in the
+    history of commit_sha (every branch when None)
+
+    Merge commits are diffed against each parent (-m), so content that only
+    appears in a merge resolution is scanned too. Output of git log is
+    streamed, so memory stays bounded by the set of blob SHAs already seen;
+    identical content is yielded once.
+    """
+    seen = set()
+    process = subprocess.Popen(
+        ['git', '-c', 'core.quotePath=false', '--git-dir', git_dir, 'log', commit_sha or '--all', '-m',
+         '--raw', '--no-abbrev', '--no-renames', '--format=commit %H', '--'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors='replace'
+    )
+    commit = None
+    try:
+        for line in process.stdout:
+            line = line.rstrip('\n')
+            if line.startswith('commit '):
+                commit = line[7:]
+            elif line.startswith(':'):
+                # :old_mode new_mode old_sha new_sha status<TAB>path
+                meta, _, path = line.partition('\t')
+                fields = meta.split()
+                new_mode, blob, status = fields[1], fields[3], fields[4]
+                if status == 'D' or new_mode == '160000' or blob in seen:
+                    continue
+                seen.add(blob)
+                yield commit, path, blob
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+class BlobReader:
+    """Read blobs through one long-running `git cat-file --batch` process"""
+
+    def __init__(self, git_dir: str, max_bytes: int = MAX_BLOB_BYTES):
+        self.max_bytes = max_bytes
+        self.process = subprocess.Popen(
+            ['git', '--git-dir', git_dir, 'cat-file', '--batch'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+
+    def read(self, sha: str) -> Optional[bytes]:
+        """Blob content, or None if missing or larger than max_bytes"""
+        self.process.stdin.write(sha.encode() + b'\n')
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            return None
+        size = int(header[2])
+
+        if size > self.max_bytes:
+            # Drain oversized blobs in chunks without keeping them
+            remaining = size + 1
+            while remaining:
+                chunk = self.process.stdout.read(min(remaining, 65536))
+                if not chunk:
+                    # cat-file exited mid-blob
+                    break
+                remaining -= len(chunk)
+            return None
+
+        data = self.process.stdout.read(size)
+        self.process.stdout.read(1)
+        return data if len(data) == size else None
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+def scan_history(git_dir: str, commit_sha: str = None, max_findings: int = MAX_FINDINGS) -> List[Dict]:
+    """Scan every distinct blob in the history of commit_sha (all branches when None)"""
+    findings = []
+    reader = BlobReader(git_dir)
+    try:
+        for commit, path, blob in iter_history_blobs(git_dir, commit_sha):
+            data = reader.read(blob)
+            text = _decode(data) if data else None
+            if text is None:
+                continue
+            for kind, line in scan_text(text):
+                findings.append({'commit': commit, 'path': path, 'kind': kind, 'line': line})
+            if len(findings) >= max_findings:
+                break
+    finally:
+        reader.close()
+    return findings[:max_findings]
+
+
+def scan_snapshot(snapshot: RepoSnapshot, max_findings: int = MAX_FINDINGS) -> List[Dict]:
+    """Scan the files of one commit (no history)"""
+    findings = []
+    for path in snapshot.files():
+        full_path = os.path.join(snapshot.root, path)
+        if os.path.getsize(full_path) > MAX_BLOB_BYTES:
+            continue
+        with open(full_path, 'rb') as f:
+            text = _decode(f.read())
+        if text is None:
+            continue
+        for kind, line in scan_text(text):
+            findings.append({'commit': None, 'path': path, 'kind': kind, 'line': line})
+        if len(findings) >= max_findings:
+            break
+    return findings[:max_findings]
+
+
+def scan_repository(repo_url: str, commit_sha: str, snapshot: RepoSnapshot = None,
+                    workspace: str = None) -> Tuple[List[Dict], str]:
+    """
+    Scan the history of the submitted commit, falling back to the snapshot tree
+
+    Only commits reachable from commit_sha are scanned: not later pushes,
+    and not pull requests other people opened against the repo. The clone
+    is kept in `workspace` (HISTORY_DIR by default) for later scans.
+    Returns (findings, scope) where scope is 'history' or 'snapshot'.
+    """
+    workspace = workspace or HISTORY_DIR
+    try:
+        with _mirror_lock(_mirror_path(repo_url, workspace)):
+            git_dir = update_mirror(repo_url, commit_sha, workspace)
+            findings = scan_history(git_dir, commit_sha)
+    except (subprocess.SubprocessError, OSError) as e:
+        if snapshot is None:
+            raise
+        print(f"  ⊘ Could not clone {repo_url} ({e.__class__.__name__}), scanning snapshot only")
+        return scan_snapshot(snapshot), 'snapshot'
+
+    prune_mirrors(workspace)
+    return findings, 'history'
+
+
+def format_findings(findings: List[Dict]) -> str:
+    lines = []
+    for finding in findings:
+        where = f"{finding['commit'][:12]} " if finding['commit'] else ''
+        lines.append(f"{where}{finding['path']}:{finding['line']}: {finding['kind']}")
+    return "\n".join(lines)
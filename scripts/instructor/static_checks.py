@@ -3,24 +3,90 @@
 Static checks: LICENSE, README, code quality, security
 """
 
+import os
 import re
-import requests
-from typing import Dict, Tuple
+import threading
+from datetime import timezone
+from typing import Dict, Optional, Tuple
 
+from file_cache import FileCache
+from github_client import github_get
+from repo_snapshot import RepoSnapshot
+from secret_scanner import scan_repository, format_findings
 
-def check_license(repo_url: str, commit_sha: str) -> Tuple[float, str, str]:
+
+# Raw file content is cached on disk when the commit is pinned by full SHA,
+# since that content can never change
+RAW_CACHE_DIR = os.path.expanduser(os.getenv('RAW_CACHE_DIR', '~/.cache/llm-deployment/raw'))
+RAW_CACHE_MAX_MB = int(os.getenv('RAW_CACHE_MAX_MB', 512))
+RAW_CACHE_NEGATIVE_TTL = float(os.getenv('RAW_CACHE_NEGATIVE_TTL', 3600))
+
+_raw_cache = None
+_raw_cache_lock = threading.Lock()
+
+
+def _get_raw_cache() -> Optional[FileCache]:
+    global _raw_cache
+    if not RAW_CACHE_DIR:
+        return None
+    with _raw_cache_lock:
+        if _raw_cache is None:
+            _raw_cache = FileCache(RAW_CACHE_DIR, RAW_CACHE_MAX_MB * 1024 * 1024,
+                                   RAW_CACHE_NEGATIVE_TTL)
+    return _raw_cache
+
+
+def _owner_repo(repo_url: str) -> str:
+    parts = repo_url.rstrip('/').replace('https://github.com/', '').split('/')
+    return '/'.join(parts[:2])
+
+
+def fetch_raw_file(repo_url: str, commit_sha: str, file_path: str) -> Tuple[int, str]:
+    """
+    Fetch a file at a commit from raw.githubusercontent.com
+
+    Returns (status_code, text). 200 and 404 responses for full commit SHAs
+    are served from the on-disk cache after the first fetch.
+    """
+    cache = _get_raw_cache() if re.fullmatch(r'[0-9a-f]{40}', commit_sha or '') else None
+    key = f"{_owner_repo(repo_url)}@{commit_sha}:{file_path}"
+
+    if cache:
+        hit, content = cache.get(key)
+        if hit:
+            return (200, content) if content is not None else (404, '')
+
+    raw_url = repo_url.replace('github.com', 'raw.githubusercontent.com')
+    response = github_get(f"{raw_url}/{commit_sha}/{file_path}", timeout=10)
+
+    if cache:
+        if response.status_code == 200:
+            cache.set(key, response.text)
+        elif response.status_code == 404:
+            cache.set_missing(key)
+
+    return response.status_code, response.text
+
+
+def _read_file(repo_url: str, commit_sha: str, file_path: str,
+               snapshot: Optional[RepoSnapshot] = None) -> Tuple[int, str]:
+    """Read a file from the snapshot when there is one, otherwise from GitHub"""
+    if snapshot is not None:
+        content = snapshot.read(file_path)
+        return (200, content) if content is not None else (404, '')
+    return fetch_raw_file(repo_url, commit_sha, file_path)
+
+
+def check_license(repo_url: str, commit_sha: str,
+                  snapshot: Optional[RepoSnapshot] = None) -> Tuple[float, str, str]:
     """Check if repo has MIT LICENSE"""
     try:
-        # Construct raw GitHub URL
-        license_url = repo_url.replace('github.com', 'raw.githubusercontent.com')
-        license_url = f"{license_url}/{commit_sha}/LICENSE"
-        
-        response = requests.get(license_url, timeout=10)
+        status_code, content = _read_file(repo_url, commit_sha, 'LICENSE', snapshot)
         
-        if response.status_code != 200:
+        if status_code != 200:
             return (0.0, "LICENSE file not found", "")
         
-        content = response.text.lower()
+        content = content.lower()
         
         # Check for MIT license indicators
         if 'mit license' in content or 'mit' in content[:200]:
@@ -32,19 +98,15 @@ def check_license(repo_url: str, commit_sha: str) -> Tuple[float, str, str]:
         return (0.0, f"Error checking LICENSE: {str(e)}", "")
 
 
-def check_readme_exists(repo_url: str, commit_sha: str) -> Tuple[float, str, str]:
+def check_readme_exists(repo_url: str, commit_sha: str,
+                        snapshot: Optional[RepoSnapshot] = None) -> Tuple[float, str, str]:
     """Check if README.md exists and is substantial"""
     try:
-        readme_url = repo_url.replace('github.com', 'raw.githubusercontent.com')
-        readme_url = f"{readme_url}/{commit_sha}/README.md"
+        status_code, content = _read_file(repo_url, commit_sha, 'README.md', snapshot)
         
-        response = requests.get(readme_url, timeout=10)
-        
-        if response.status_code != 200:
+        if status_code != 200:
             return (0.0, "README.md not found", "")
         
-        content = response.text
-        
         # Check length
         if len(content) < 200:
             return (0.3, "README.md too short", content)
@@ -79,25 +141,42 @@ def check_readme_exists(repo_url: str, commit_sha: str) -> Tuple[float, str, str
         return (0.0, f"Error checking README: {str(e)}", "")
 
 
-def check_repo_created_after_task(repo_url: str, task_timestamp) -> Tuple[float, str, str]:
-    """Check if repo was created after task was sent"""
+# Default for check_repo_created_after_task: metadata was not looked up
+_NO_METADATA = object()
+
+
+def check_repo_created_after_task(repo_url: str, task_timestamp,
+                                  metadata: Optional[Dict] = _NO_METADATA) -> Tuple[float, str, str]:
+    """
+    Check if repo was created after task was sent
+
+    Uses the result of repo_metadata.get_repo_metadata when given instead
+    of calling the API; None or a row without created_at means that lookup
+    already failed, so the API is not asked again.
+    """
     try:
-        # Extract owner and repo name
-        parts = repo_url.replace('https://github.com/', '').split('/')
-        owner, repo = parts[0], parts[1]
-        
-        api_url = f"https://api.github.com/repos/{owner}/{repo}"
-        response = requests.get(api_url, timeout=10)
-        
-        if response.status_code != 200:
-            return (0.0, "Could not fetch repo metadata", "")
-        
-        data = response.json()
-        created_at = data['created_at']
+        if metadata is not _NO_METADATA:
+            if not metadata or not metadata.get('created_at'):
+                return (0.0, "Could not fetch repo metadata", "")
+            repo_time = metadata['created_at']
+        else:
+            # Extract owner and repo name
+            parts = repo_url.replace('https://github.com/', '').split('/')
+            owner, repo = parts[0], parts[1]
+            
+            api_url = f"https://api.github.com/repos/{owner}/{repo}"
+            response = github_get(api_url, timeout=10)
+            
+            if response.status_code != 200:
+                return (0.0, "Could not fetch repo metadata", "")
+            
+            from dateutil import parser
+            repo_time = parser.parse(response.json()['created_at'])
         
-        # Compare timestamps
-        from dateutil import parser
-        repo_time = parser.parse(created_at)
+        # Task timestamps are stored as naive UTC
+        if repo_time.tzinfo is not None:
+            repo_time = repo_time.astimezone(timezone.utc).replace(tzinfo=None)
+        created_at = repo_time.strftime('%Y-%m-%dT%H:%M:%SZ')
         
         if repo_time > task_timestamp:
             return (1.0, f"Repo created after task ({created_at})", created_at)
@@ -108,45 +187,33 @@ def check_repo_created_after_task(repo_url: str, task_timestamp) -> Tuple[float,
         return (0.5, f"Error checking creation time: {str(e)}", "")
 
 
-def check_no_secrets_in_history(repo_url: str) -> Tuple[float, str, str]:
+def check_no_secrets_in_history(repo_url: str, commit_sha: str,
+                                snapshot: Optional[RepoSnapshot] = None) -> Tuple[float, str, str]:
     """
-    Basic check for common secret patterns
-    Note: Full trufflehog/gitleaks scan would be more thorough
+    Scan every commit up to commit_sha for known token formats and high-entropy secrets
+
+    Falls back to the files of the snapshot when the repo cannot be cloned.
     """
     try:
-        # This is a simplified check - in production, use trufflehog or gitleaks
-        # For now, check the current files for obvious secrets
+        findings, scope = scan_repository(repo_url, commit_sha, snapshot)
         
-        owner_repo = repo_url.replace('https://github.com/', '')
-        api_url = f"https://api.github.com/repos/{owner_repo}/contents"
+        if findings:
+            return (0.0, f"Possible secrets found ({len(findings)} in {scope})", format_findings(findings))
         
-        response = requests.get(api_url, timeout=10)
-        
-        if response.status_code != 200:
-            return (0.5, "Could not scan repository", "")
-        
-        # In a real implementation, you would:
-        # 1. Clone the repo
-        # 2. Run trufflehog or gitleaks
-        # 3. Parse results
-        
-        # For now, return a pass
-        return (1.0, "Basic secret scan passed", "No obvious secrets detected")
+        return (1.0, f"Secret scan passed ({scope})", "No secrets detected")
         
     except Exception as e:
         return (0.5, f"Error scanning for secrets: {str(e)}", "")
 
 
-def get_file_content(repo_url: str, commit_sha: str, file_path: str) -> str:
+def get_file_content(repo_url: str, commit_sha: str, file_path: str,
+                     snapshot: Optional[RepoSnapshot] = None) -> str:
     """Get file content from GitHub"""
     try:
-        raw_url = repo_url.replace('github.com', 'raw.githubusercontent.com')
-        file_url = f"{raw_url}/{commit_sha}/{file_path}"
+        status_code, content = _read_file(repo_url, commit_sha, file_path, snapshot)
         
-        response = requests.get(file_url, timeout=10)
-        
-        if response.status_code == 200:
-            return response.text
+        if status_code == 200:
+            return content
         return ""
         
     except Exception as e:
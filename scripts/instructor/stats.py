@@ -0,0 +1,87 @@
+"""
+Submission statistics in a single aggregate query
+"""
+
+from typing import Dict
+
+from sqlalchemy import select, func, case, literal, cast, null, distinct, union_all, Integer, Float, String
+
+from db_models import Task, Repo, Result
+
+
+PASS_THRESHOLD = 0.7
+
+
+def _columns(kind: str, round_col, total, ok=None, score_sum=None):
+    """Uniformly typed columns so every branch of the UNION lines up"""
+    return [
+        cast(literal(kind), String).label('kind'),
+        cast(round_col, Integer).label('round'),
+        total.label('total'),
+        cast(ok if ok is not None else literal(0), Integer).label('ok'),
+        cast(score_sum if score_sum is not None else literal(0.0), Float).label('score_sum'),
+    ]
+
+
+def stats_query():
+    """
+    One round trip returning grouped counts for every table
+
+    Each row is (kind, round, total, ok, score_sum). `ok` is successful
+    deliveries for tasks and passed checks for results; the 'students' row
+    carries the number of distinct submitting emails.
+    """
+    tasks = select(*_columns(
+        'tasks', Task.round, func.count(Task.id),
+        ok=func.sum(case((Task.statuscode == 200, 1), else_=0))
+    )).group_by(Task.round)
+
+    repos = select(*_columns('repos', Repo.round, func.count(Repo.id))).group_by(Repo.round)
+
+    results = select(*_columns(
+        'results', Result.round, func.count(Result.id),
+        ok=func.sum(case((Result.score >= PASS_THRESHOLD, 1), else_=0)),
+        score_sum=func.sum(Result.score)
+    )).group_by(Result.round)
+
+    students = select(*_columns('students', null(), func.count(distinct(Repo.email))))
+
+    return union_all(tasks, repos, results, students)
+
+
+def _empty_counts() -> Dict:
+    return {
+        'tasks_sent': 0, 'tasks_successful': 0, 'repos_submitted': 0,
+        'results': 0, 'results_passed': 0, 'score_sum': 0.0
+    }
+
+
+def summarize_stats(rows) -> Dict:
+    """Fold aggregate rows into per-round counts and overall totals"""
+    rounds = {}
+    totals = _empty_counts()
+    totals['unique_students'] = 0
+
+    for kind, round_num, total, ok, score_sum in rows:
+        if kind == 'students':
+            totals['unique_students'] = total
+            continue
+
+        counts = rounds.setdefault(round_num, _empty_counts())
+        if kind == 'tasks':
+            updates = {'tasks_sent': total, 'tasks_successful': ok or 0}
+        elif kind == 'repos':
+            updates = {'repos_submitted': total}
+        else:
+            updates = {'results': total, 'results_passed': ok or 0, 'score_sum': score_sum or 0.0}
+
+        for key, value in updates.items():
+            counts[key] = value
+            totals[key] += value
+
+    return {'rounds': rounds, 'totals': totals}
+
+
+def collect_stats(session) -> Dict:
+    """Per-round task, repo and result counts from one query"""
+    return summarize_stats(session.execute(stats_query()).all())
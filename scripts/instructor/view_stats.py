@@ -8,7 +8,8 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from db_models import get_session, Task, Repo, Result
+from db_models import get_session, Repo, Result
+from stats import collect_stats
 from sqlalchemy import func
 
 
@@ -21,45 +22,45 @@ def show_stats():
     print("LLM DEPLOYMENT SYSTEM - DATABASE STATISTICS")
     print("="*60 + "\n")
     
+    stats = collect_stats(session)
+    totals = stats['totals']
+    rounds = stats['rounds']
+    
+    def round_count(round_num, key):
+        return rounds.get(round_num, {}).get(key, 0)
+    
     # Tasks
     print("📋 TASKS")
     print("-" * 60)
-    total_tasks = session.query(Task).count()
-    round1_tasks = session.query(Task).filter_by(round=1).count()
-    round2_tasks = session.query(Task).filter_by(round=2).count()
-    successful_tasks = session.query(Task).filter(Task.statuscode == 200).count()
+    total_tasks = totals['tasks_sent']
+    successful_tasks = totals['tasks_successful']
     
     print(f"  Total tasks sent: {total_tasks}")
-    print(f"  Round 1: {round1_tasks}")
-    print(f"  Round 2: {round2_tasks}")
+    print(f"  Round 1: {round_count(1, 'tasks_sent')}")
+    print(f"  Round 2: {round_count(2, 'tasks_sent')}")
     print(f"  Successful (HTTP 200): {successful_tasks}")
     print(f"  Failed: {total_tasks - successful_tasks}\n")
     
     # Repos
     print("📦 REPOSITORIES")
     print("-" * 60)
-    total_repos = session.query(Repo).count()
-    round1_repos = session.query(Repo).filter_by(round=1).count()
-    round2_repos = session.query(Repo).filter_by(round=2).count()
-    unique_students = session.query(Repo.email).distinct().count()
     
-    print(f"  Total submissions: {total_repos}")
-    print(f"  Round 1: {round1_repos}")
-    print(f"  Round 2: {round2_repos}")
-    print(f"  Unique students: {unique_students}\n")
+    print(f"  Total submissions: {totals['repos_submitted']}")
+    print(f"  Round 1: {round_count(1, 'repos_submitted')}")
+    print(f"  Round 2: {round_count(2, 'repos_submitted')}")
+    print(f"  Unique students: {totals['unique_students']}\n")
     
     # Results
     print("✅ EVALUATION RESULTS")
     print("-" * 60)
-    total_results = session.query(Result).count()
-    avg_score = session.query(func.avg(Result.score)).scalar()
-    passed = session.query(Result).filter(Result.score >= 0.7).count()
-    failed = session.query(Result).filter(Result.score < 0.7).count()
+    total_results = totals['results']
+    avg_score = totals['score_sum'] / total_results if total_results else None
+    passed = totals['results_passed']
     
     print(f"  Total checks run: {total_results}")
-    print(f"  Average score: {avg_score:.2f}" if avg_score else "  Average score: N/A")
+    print(f"  Average score: {avg_score:.2f}" if avg_score is not None else "  Average score: N/A")
     print(f"  Passed (≥0.7): {passed}")
-    print(f"  Failed (<0.7): {failed}\n")
+    print(f"  Failed (<0.7): {total_results - passed}\n")
     
     # Top checks
     print("🏆 CHECK PERFORMANCE")